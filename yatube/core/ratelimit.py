@@ -0,0 +1,83 @@
+import math
+import time
+from functools import lru_cache, wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+
+PERIODS = {'s': 1, 'm': 60, 'h': 60 * 60, 'd': 24 * 60 * 60}
+
+
+@lru_cache(maxsize=None)
+def parse_rate(rate):
+    """Разбираем лимит вида '10/m' в пару (запросов, секунд)."""
+    count, period = rate.split('/')
+    return int(count), PERIODS[period]
+
+
+def hit(key, rate, now=None):
+    """Учитываем запрос в корзине key.
+
+    Корзина пополняется равномерно: разрешено не больше count запросов
+    за любые period секунд. Считаем это скользящим окном из двух
+    счетчиков в общем кэше, запрос стоит одного атомарного incr.
+    Возвращаем 0, если запрос разрешен, иначе секунды до повтора.
+    """
+    limit, period = parse_rate(rate)
+    now = now or time.time()
+    window, elapsed = divmod(now, period)
+    current = f'ratelimit:{key}:{int(window)}'
+    previous = cache.get(f'ratelimit:{key}:{int(window) - 1}', 0)
+    try:
+        count = cache.incr(current)
+    except ValueError:
+        cache.add(current, 0, period * 2)
+        count = cache.incr(current)
+    if previous * (1 - elapsed / period) + count <= limit:
+        return 0
+    return math.ceil(period - elapsed)
+
+
+def get_client_ip(request):
+    return request.META.get(settings.RATELIMIT_IP_HEADER, '')
+
+
+def check_ratelimit(request, scope):
+    """Проверяем корзины пользователя и IP-адреса для области scope
+    по лимитам из settings.RATELIMITS."""
+    limits = settings.RATELIMITS.get(scope)
+    if not limits or not settings.RATELIMIT_ENABLED:
+        return 0
+    retry_after = 0
+    if 'user' in limits and request.user.is_authenticated:
+        retry_after = hit(f'{scope}:user:{request.user.pk}', limits['user'])
+    if not retry_after and 'ip' in limits:
+        retry_after = hit(
+            f'{scope}:ip:{get_client_ip(request)}', limits['ip'],
+        )
+    return retry_after
+
+
+def ratelimit(scope, methods=None):
+    """Ограничиваем частоту запросов к представлению.
+
+    Сверх лимита отвечаем 429 без обращения к БД и шаблонам.
+    Если methods задан, считаются только запросы этими методами.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if methods is None or request.method in methods:
+                retry_after = check_ratelimit(request, scope)
+                if retry_after:
+                    response = HttpResponse(
+                        'Слишком много запросов, попробуйте позже.',
+                        content_type='text/plain; charset=utf-8',
+                        status=429,
+                    )
+                    response['Retry-After'] = str(retry_after)
+                    return response
+            return view(request, *args, **kwargs)
+        return wrapper
+    return decorator
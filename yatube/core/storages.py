@@ -0,0 +1,63 @@
+import hashlib
+import os
+import posixpath
+import re
+
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+from django.utils.deconstruct import deconstructible
+
+HASHED_NAME = re.compile(
+    r'(?:^|/)([0-9a-f]{2})/([0-9a-f]{2})/\1\2[0-9a-f]{60}'
+)
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+    """Файлы с именами по SHA-256 содержимого: posts/ab/cd/abcd….jpg.
+
+    Две пары первых символов хэша раскладывают файлы по вложенным
+    каталогам, чтобы в каждом было немного файлов. Одинаковое
+    содержимое записывается один раз: повторное сохранение только
+    обновляет время изменения файла и возвращает его имя. Удалять файл
+    можно, лишь убедившись, что на него никто не ссылается.
+    """
+
+    def get_hashed_name(self, name, content):
+        """Имя файла в каталоге name по хэшу содержимого.
+
+        Файл читается по частям, поэтому память не зависит от размера.
+        """
+        digest = hashlib.sha256()
+        content.seek(0)
+        for chunk in content.chunks():
+            digest.update(chunk)
+        content.seek(0)
+        digest = digest.hexdigest()
+        extension = os.path.splitext(name)[1].lower()
+        return posixpath.join(
+            posixpath.dirname(name), digest[:2], digest[2:4],
+            digest + extension,
+        )
+
+    @staticmethod
+    def is_hashed(name):
+        return HASHED_NAME.search(name) is not None
+
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+        if not hasattr(content, 'chunks'):
+            content = File(content, name)
+        name = self.get_hashed_name(name, content)
+        if self.exists(name):
+            # Свежее время изменения защищает файл от сборки мусора,
+            # пока ссылка на него еще не сохранена.
+            try:
+                os.utime(self.path(name))
+            except FileNotFoundError:
+                # Сборщик мусора успел удалить файл: записываем заново.
+                pass
+            else:
+                return name
+        return super().save(name, content, max_length)
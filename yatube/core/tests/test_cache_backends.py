@@ -0,0 +1,96 @@
+import multiprocessing
+import os
+import shutil
+import tempfile
+import time
+
+from django.conf import settings
+from django.test import SimpleTestCase
+
+from ..cache_backends import SQLiteCache
+
+TEMP_CACHE_DIR = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+def make_cache(**options):
+    return SQLiteCache(
+        os.path.join(TEMP_CACHE_DIR, 'cache.sqlite3'),
+        {'OPTIONS': options},
+    )
+
+
+def incr_many(times):
+    cache = make_cache()
+    for _ in range(times):
+        cache.incr('shared')
+
+
+class SQLiteCacheTests(SimpleTestCase):
+    """Тестируем общий для процессов кэш на SQLite."""
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_CACHE_DIR, ignore_errors=True)
+
+    def setUp(self):
+        self.cache = make_cache()
+        self.cache.clear()
+
+    def test_set_get_add_delete(self):
+        """Проверяем базовые операции кэша."""
+        self.cache.set('key', {'value': [1, 2]})
+        self.assertEqual(self.cache.get('key'), {'value': [1, 2]})
+        self.assertFalse(self.cache.add('key', 'другое'))
+        self.assertTrue(self.cache.add('new', True))
+        self.assertIs(self.cache.get('new'), True)
+        self.cache.delete('key')
+        self.assertIsNone(self.cache.get('key'))
+        self.assertEqual(self.cache.get('key', 'нет'), 'нет')
+
+    def test_many_and_incr(self):
+        """Проверяем get_many, set_many и incr."""
+        self.cache.set_many({'a': 1, 'b': 'два'})
+        self.assertEqual(
+            self.cache.get_many(['a', 'b', 'c']), {'a': 1, 'b': 'два'}
+        )
+        self.assertEqual(self.cache.incr('a', 10), 11)
+        self.assertEqual(self.cache.decr('a'), 10)
+        with self.assertRaises(ValueError):
+            self.cache.incr('c')
+
+    def test_expired_values_are_not_returned(self):
+        """Проверяем, что просроченные записи не возвращаются."""
+        self.cache.set('key', 'значение', 0.01)
+        time.sleep(0.02)
+        self.assertIsNone(self.cache.get('key'))
+        self.assertTrue(self.cache.add('key', 'новое'))
+
+    def test_least_recently_used_values_are_evicted(self):
+        """Проверяем вытеснение давно не читанных записей."""
+        cache = make_cache(MAX_ENTRIES=10, CULL_FREQUENCY=10)
+        cache.set_many({f'key_{i}': i for i in range(10)})
+        cache._db.execute(
+            'UPDATE cache SET accessed = 0 WHERE key != ?',
+            (cache.make_key('key_9'),),
+        )
+        cache.set('key_10', 10)
+        cache._cull()
+        self.assertLessEqual(
+            len(cache.get_many([f'key_{i}' for i in range(11)])), 10
+        )
+        self.assertEqual(cache.get('key_9'), 9)
+        self.assertEqual(cache.get('key_10'), 10)
+
+    def test_incr_is_atomic_between_processes(self):
+        """Проверяем, что incr из разных процессов не теряет обновлений."""
+        self.cache.set('shared', 0)
+        processes = [
+            multiprocessing.Process(target=incr_many, args=(50,))
+            for _ in range(4)
+        ]
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join()
+        self.assertEqual(self.cache.get('shared'), 200)
@@ -0,0 +1,51 @@
+from http import HTTPStatus
+
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, override_settings
+
+from ..ratelimit import hit, ratelimit
+
+
+@ratelimit('test')
+def view(request):
+    return HttpResponse('ok')
+
+
+@override_settings(RATELIMITS={'test': {'ip': '3/m'}})
+class RateLimitTests(SimpleTestCase):
+    """Тестируем ограничение частоты запросов."""
+
+    def setUp(self):
+        cache.clear()
+        self.factory = RequestFactory()
+
+    def request(self, ip='10.0.0.1'):
+        request = self.factory.post('/', REMOTE_ADDR=ip)
+        request.user = AnonymousUser()
+        return view(request)
+
+    def test_limit_returns_429_with_retry_after(self):
+        """Проверяем, что сверх лимита отвечаем 429."""
+        for _ in range(3):
+            self.assertEqual(self.request().status_code, HTTPStatus.OK)
+        response = self.request()
+        self.assertEqual(response.status_code, HTTPStatus.TOO_MANY_REQUESTS)
+        self.assertGreater(int(response['Retry-After']), 0)
+        self.assertEqual(
+            self.request('10.0.0.2').status_code, HTTPStatus.OK,
+        )
+
+    def test_bucket_refills_over_time(self):
+        """Проверяем, что прошлое окно перестает учитываться."""
+        for _ in range(3):
+            self.assertFalse(hit('refill', '3/m', now=600))
+        self.assertTrue(hit('refill', '3/m', now=630))
+        self.assertFalse(hit('refill', '3/m', now=719))
+
+    @override_settings(RATELIMIT_ENABLED=False)
+    def test_disabled(self):
+        """Проверяем, что ограничение можно выключить."""
+        for _ in range(5):
+            self.assertEqual(self.request().status_code, HTTPStatus.OK)
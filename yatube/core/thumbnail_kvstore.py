@@ -0,0 +1,38 @@
+from sorl.thumbnail.conf import settings
+from sorl.thumbnail.images import deserialize_image_file
+from sorl.thumbnail.kvstores import cached_db_kvstore
+from sorl.thumbnail.kvstores.base import add_prefix
+from sorl.thumbnail.models import KVStore as KVStoreModel
+
+
+class KVStore(cached_db_kvstore.KVStore):
+    """Хранилище ключей sorl в общем кэше с пакетным чтением.
+
+    Как и cached_db, хранит данные в таблице thumbnail_kvstore и кэше
+    settings.THUMBNAIL_CACHE, но умеет найти много миниатюр сразу.
+    """
+
+    def get_many(self, image_files):
+        """Описания миниатюр одним get_many к кэшу и одним запросом
+        к БД для промахов. Отсутствующим соответствует None."""
+        keys = {add_prefix(image_file.key): image_file.key
+                for image_file in image_files}
+        values = self.cache.get_many(keys)
+        missing = [key for key in keys if key not in values]
+        if missing:
+            found = dict(KVStoreModel.objects.filter(
+                key__in=missing,
+            ).values_list('key', 'value'))
+            fetched = {
+                key: found.get(key, cached_db_kvstore.EMPTY_VALUE)
+                for key in missing
+            }
+            self.cache.set_many(fetched, settings.THUMBNAIL_CACHE_TIMEOUT)
+            values.update(fetched)
+        return {
+            keys[key]: (
+                None if value == cached_db_kvstore.EMPTY_VALUE
+                else deserialize_image_file(value)
+            )
+            for key, value in values.items()
+        }
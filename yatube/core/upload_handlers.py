@@ -0,0 +1,30 @@
+from django.conf import settings
+from django.core.files.uploadhandler import TemporaryFileUploadHandler
+
+
+class LimitedTemporaryFileUploadHandler(TemporaryFileUploadHandler):
+    """Пишем загружаемый файл по частям сразу на диск.
+
+    Сохраняется не больше settings.FILE_UPLOAD_MAX_SIZE байт, остаток
+    отбрасывается, а у файла выставляется oversized, чтобы форма
+    сообщила об ошибке.
+    """
+
+    def new_file(self, *args, **kwargs):
+        super().new_file(*args, **kwargs)
+        self.written = 0
+        self.oversized = False
+
+    def receive_data_chunk(self, raw_data, start):
+        if self.oversized:
+            return None
+        if self.written + len(raw_data) > settings.FILE_UPLOAD_MAX_SIZE:
+            self.oversized = True
+            return None
+        self.written += len(raw_data)
+        return super().receive_data_chunk(raw_data, start)
+
+    def file_complete(self, file_size):
+        file = super().file_complete(self.written)
+        file.oversized = self.oversized
+        return file
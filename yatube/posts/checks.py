@@ -0,0 +1,27 @@
+from django.core import checks
+
+from .search import get_missing_triggers
+
+
+@checks.register(checks.Tags.database)
+def check_search_triggers(app_configs, **kwargs):
+    """Индексы поиска устаревают молча, если триггеры пропали.
+
+    Проверка выполняется перед migrate и по check --tag database.
+    Это предупреждение, а не ошибка: ошибка остановила бы и migrate,
+    которым триггеры восстанавливаются.
+    """
+    missing = get_missing_triggers()
+    if not missing:
+        return []
+    return [checks.Warning(
+        'Нет триггеров полнотекстового индекса: {}.'.format(
+            ', '.join(missing),
+        ),
+        hint=(
+            'Таблица поста или комментария была пересоздана миграцией. '
+            'Откатите posts до 0032_media_files и примените 0033_search_index '
+            'снова: миграция создаст триггеры и перестроит индекс.'
+        ),
+        id='posts.W001',
+    )]
@@ -0,0 +1,82 @@
+from django.conf import settings
+
+from .models import COMMENT_MAX_DEPTH, COMMENT_PATH_STEP, Comment
+from .utils import get_keyset_page
+
+
+def get_path_segment(comment_id):
+    """Номер комментария в пути: строки путей сортируются как ветка."""
+    return f'{comment_id:0{COMMENT_PATH_STEP}d}'
+
+
+def get_reply_parent(parent):
+    """Ответ глубже COMMENT_MAX_DEPTH становится соседом родителя."""
+    if parent is not None and parent.depth >= COMMENT_MAX_DEPTH:
+        return parent.parent
+    return parent
+
+
+def for_comments(queryset):
+    """Комментарии вместе с авторами одним запросом."""
+    return queryset.select_related('author').only(
+        'text',
+        'created',
+        'post_id',
+        'parent_id',
+        'root_id',
+        'depth',
+        'path',
+        'replies_count',
+        'author__username',
+    )
+
+
+def get_subtree(comment, limit=None):
+    """Комментарий и ответы на него в порядке ветки одним запросом
+    по диапазону путей, не глубже settings.COMMENTS_RENDER_DEPTH
+    уровней от комментария."""
+    # '0' идет следом за разделителем '/', поэтому все пути поддерева
+    # лежат в полуинтервале [path, path + '0').
+    subtree = for_comments(Comment.objects.filter(
+        path__gte=comment.path,
+        path__lt=f'{comment.path}0',
+        depth__lte=comment.depth + settings.COMMENTS_RENDER_DEPTH,
+    )).order_by('path')
+    subtree = list(subtree[:limit or settings.COMMENTS_THREAD_LIMIT])
+    for node in subtree:
+        node.level = node.depth - comment.depth
+    return subtree
+
+
+def attach_replies(roots):
+    """Подставляем ответы в небольшие ветки страницы одним запросом.
+
+    Ветки больше settings.COMMENTS_THREAD_PREVIEW ответов открываются
+    отдельной страницей, поэтому размер выборки ограничен.
+    """
+    for root in roots:
+        root.level = 0
+        root.preview = []
+    threads = {
+        root.pk: root for root in roots
+        if 0 < root.replies_count <= settings.COMMENTS_THREAD_PREVIEW
+    }
+    if not threads:
+        return
+    replies = for_comments(Comment.objects.filter(
+        root_id__in=threads,
+        depth__gt=0,
+        depth__lte=settings.COMMENTS_RENDER_DEPTH,
+    )).order_by('root', 'path')
+    for reply in replies:
+        reply.level = reply.depth
+        threads[reply.root_id].preview.append(reply)
+
+
+def get_comments_page(post_id, cursor=None):
+    """Страница веток комментариев поста с ответами: два запроса
+    при любом количестве комментариев."""
+    roots = for_comments(Comment.objects.filter(post_id=post_id, parent=None))
+    page = get_keyset_page(roots, cursor, settings.COMMENTS_PER_PAGE)
+    attach_replies(page.object_list)
+    return page
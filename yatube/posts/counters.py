@@ -0,0 +1,174 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, F, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce, Greatest
+
+from .models import (Comment, Counter, Follow, Group, Post, PostRating,
+                     Profile, User)
+
+POSTS_TOTAL = 'posts'
+
+
+def _change(queryset, **deltas):
+    """Атомарно меняем счетчики на дельту, не опускаясь ниже нуля."""
+    return queryset.update(**{
+        field: Greatest(F(field) + delta, 0)
+        for field, delta in deltas.items()
+    })
+
+
+def _change_profile(user_id, **deltas):
+    """Меняем счетчики профиля, создавая профиль при первом обращении."""
+    if not _change(Profile.objects.filter(user_id=user_id), **deltas):
+        recount_profiles(User.objects.filter(pk=user_id))
+
+
+def _decrease_profile(user_id, **deltas):
+    """Уменьшаем счетчики профиля, не создавая его.
+
+    Посты и подписки удаляются и каскадом вместе с пользователем: его
+    профиль к этому моменту может быть уже удален, и создавать его
+    заново нельзя. Профиль без строки пересчитается при первом
+    обращении.
+    """
+    _change(Profile.objects.filter(user_id=user_id), **deltas)
+
+
+def get_profile(user):
+    """Профиль со счетчиками пользователя."""
+    try:
+        return Profile.objects.get(user=user)
+    except Profile.DoesNotExist:
+        recount_profiles(User.objects.filter(pk=user.pk))
+        return Profile.objects.get(user=user)
+
+
+def get_posts_total():
+    """Общее количество постов."""
+    counter = Counter.objects.filter(name=POSTS_TOTAL).first()
+    if counter is None:
+        counter, _ = Counter.objects.get_or_create(
+            name=POSTS_TOTAL, defaults={'value': Post.objects.count()},
+        )
+    return counter.value
+
+
+def get_estimated_count(key, queryset):
+    """Количество объектов выборки, устаревающее не дольше
+    settings.COUNT_ESTIMATE_TIMEOUT секунд."""
+    count = cache.get(key)
+    if count is None:
+        count = queryset.count()
+        cache.set(key, count, settings.COUNT_ESTIMATE_TIMEOUT)
+    return count
+
+
+def change_posts_count(post, delta):
+    """Учитываем новый или удаленный пост у автора, группы и на сайте."""
+    if not _change(Counter.objects.filter(name=POSTS_TOTAL), value=delta):
+        get_posts_total()
+    if delta > 0:
+        _change_profile(post.author_id, posts_count=delta)
+    else:
+        _decrease_profile(post.author_id, posts_count=delta)
+    profile = Profile.objects.filter(user_id=post.author_id)
+    if delta > 0:
+        profile.filter(
+            Q(last_post_at=None) | Q(last_post_at__lt=post.created),
+        ).update(last_post_at=post.created)
+    else:
+        profile.update(last_post_at=_last_post_at())
+    change_group_posts_count(post.group_id, delta)
+
+
+def change_group_posts_count(group_id, delta):
+    """Учитываем пост, добавленный в группу или убранный из нее."""
+    if group_id:
+        _change(Group.objects.filter(pk=group_id), posts_count=delta)
+
+
+def change_rating_count(post_id, delta):
+    """Учитываем поставленную или снятую оценку поста."""
+    _change(Post.objects.filter(pk=post_id), rating_count=delta)
+
+
+def change_comments_count(post_id, delta):
+    """Учитываем новый или удаленный комментарий к посту."""
+    _change(Post.objects.filter(pk=post_id), comments_count=delta)
+
+
+def change_replies_count(root_id, delta):
+    """Учитываем ответ в ветке комментариев."""
+    _change(Comment.objects.filter(pk=root_id), replies_count=delta)
+
+
+def change_follow_counters(user_id, author_id, delta):
+    """Учитываем подписку пользователя на автора."""
+    change = _change_profile if delta > 0 else _decrease_profile
+    change(user_id, following_count=delta)
+    change(author_id, followers_count=delta)
+
+
+def _count(model, field, outer_field='pk', **filters):
+    """Подзапрос количества строк модели, ссылающихся на внешнюю строку."""
+    rows = model.objects.filter(**{field: OuterRef(outer_field)}, **filters)
+    return Coalesce(Subquery(
+        rows.order_by().values(field).annotate(
+            total=Count('pk'),
+        ).values('total')
+    ), 0)
+
+
+def recount_posts(queryset):
+    """Пересчитываем счетчики постов из queryset и ответов в ветках
+    их комментариев."""
+    queryset.update(
+        rating_count=_count(PostRating, 'post'),
+        comments_count=_count(Comment, 'post'),
+    )
+    Comment.objects.filter(post__in=queryset, depth=0).update(
+        replies_count=_count(Comment, 'root', depth__gt=0),
+    )
+
+
+def recount_posts_total():
+    """Пересчитываем общее количество постов."""
+    Counter.objects.update_or_create(
+        name=POSTS_TOTAL, defaults={'value': Post.objects.count()},
+    )
+
+
+def recount_groups(queryset):
+    """Пересчитываем счетчики групп из queryset."""
+    queryset.update(posts_count=_count(Post, 'group'))
+
+
+def recount_profiles(users):
+    """Пересчитываем счетчики профилей пользователей из users."""
+    user_ids = list(users.values_list('pk', flat=True))
+    existing = set(Profile.objects.filter(
+        user_id__in=user_ids,
+    ).values_list('user_id', flat=True))
+    Profile.objects.bulk_create(
+        [
+            Profile(user_id=user_id)
+            for user_id in user_ids
+            if user_id not in existing
+        ],
+        ignore_conflicts=True,
+    )
+    Profile.objects.filter(user_id__in=user_ids).update(
+        posts_count=_count(Post, 'author', 'user'),
+        followers_count=_count(Follow, 'author', 'user'),
+        following_count=_count(Follow, 'user', 'user'),
+        last_post_at=_last_post_at(),
+    )
+
+
+def _last_post_at():
+    """Подзапрос даты последнего поста владельца профиля."""
+    return Subquery(
+        Post.objects.filter(author=OuterRef('user')).order_by(
+            '-created',
+        ).values('created')[:1]
+    )
@@ -0,0 +1,135 @@
+from django.conf import settings
+from django.db.models import F, OuterRef, Q, Subquery
+
+from .counters import get_profile
+from .follow_graph import get_following_ids, get_pull_authors
+from .models import FeedEntry, Follow, Post, User
+
+# Ключ сортировки ленты подписок: аннотации из get_follow_feed.
+FEED_KEYSET = ('feed_created', 'feed_pk')
+
+
+def is_pull_author(author):
+    """Проверяем, подмешиваются ли посты автора при чтении."""
+    return (
+        get_profile(author).followers_count
+        > settings.FEED_FANOUT_MAX_FOLLOWERS
+    )
+
+
+def trim_feeds(user_ids):
+    """Оставляем в лентах пользователей не больше FEED_MAX_ENTRIES записей.
+
+    Граница задается парой (created, pk) первой лишней записи, чтобы
+    записи с одинаковым временем не удалялись сверх лимита.
+    """
+    cutoff = FeedEntry.objects.filter(
+        user=OuterRef('pk'),
+    ).order_by('-created', '-pk')[
+        settings.FEED_MAX_ENTRIES:settings.FEED_MAX_ENTRIES + 1
+    ]
+    overflow = User.objects.filter(pk__in=user_ids).annotate(
+        cutoff_created=Subquery(cutoff.values('created')),
+        cutoff_pk=Subquery(cutoff.values('pk')),
+    ).exclude(cutoff_pk=None).values_list(
+        'pk', 'cutoff_created', 'cutoff_pk',
+    )
+    stale = Q()
+    for user_id, created, pk in overflow:
+        stale |= Q(user_id=user_id) & (
+            Q(created__lt=created) | Q(created=created, pk__lte=pk)
+        )
+    if stale:
+        FeedEntry.objects.filter(stale).delete()
+
+
+def fan_out_post(post):
+    """Раскладываем новый пост по лентам подписчиков автора."""
+    if is_pull_author(post.author):
+        return
+    follower_ids = Follow.objects.filter(
+        author=post.author,
+    ).values_list('user', flat=True)
+    batch = []
+    for user_id in follower_ids.iterator():
+        batch.append(user_id)
+        if len(batch) == settings.FEED_FANOUT_BATCH:
+            _push_post(post, batch)
+            batch = []
+    if batch:
+        _push_post(post, batch)
+
+
+def _push_post(post, user_ids):
+    FeedEntry.objects.bulk_create(
+        [
+            FeedEntry(
+                user_id=user_id,
+                post=post,
+                author_id=post.author_id,
+                created=post.created,
+            )
+            for user_id in user_ids
+        ],
+        ignore_conflicts=True,
+    )
+    trim_feeds(user_ids)
+
+
+def backfill_feed(user, author):
+    """Добавляем в ленту последние посты автора после подписки."""
+    if is_pull_author(author):
+        return
+    posts = author.author_of_posts.order_by('-created').values_list(
+        'pk', 'created',
+    )[:settings.FEED_MAX_ENTRIES]
+    FeedEntry.objects.bulk_create(
+        [
+            FeedEntry(
+                user=user,
+                post_id=post_id,
+                author=author,
+                created=created,
+            )
+            for post_id, created in posts
+        ],
+        ignore_conflicts=True,
+    )
+    trim_feeds([user.pk])
+
+
+def clear_feed(user, author):
+    """Убираем из ленты посты автора после отписки."""
+    FeedEntry.objects.filter(user=user, author=author).delete()
+
+
+def get_follow_feed(user, author_ids=None):
+    """Посты ленты подписок пользователя, упорядочиваемые по FEED_KEYSET.
+
+    Обычно это выборка по индексу ленты пользователя: ключ берется
+    из записей ленты, и страница читается диапазоном индекса
+    (user, created) без сортировки постов. Посты авторов с очень
+    большим числом подписчиков не раскладываются по лентам
+    и подмешиваются здесь по явному списку id, тогда ключ берется
+    из самих постов. Если author_ids не передан, подписки берутся
+    из кэша графа подписок.
+    """
+    if author_ids is None:
+        author_ids = get_following_ids(user.pk)
+    if not author_ids:
+        return Post.objects.none().annotate(
+            feed_created=F('created'), feed_pk=F('pk'),
+        )
+    pull_authors = get_pull_authors()
+    pull_author_ids = [
+        author_id for author_id in author_ids if author_id in pull_authors
+    ]
+    if not pull_author_ids:
+        return Post.objects.filter(feed_entries__user=user).annotate(
+            feed_created=F('feed_entries__created'),
+            feed_pk=F('feed_entries__pk'),
+        )
+    return Post.objects.filter(
+        Q(pk__in=FeedEntry.objects.filter(user=user).values('post'))
+        | Q(author_id__in=pull_author_ids)
+    ).annotate(feed_created=F('created'), feed_pk=F('pk'))
@@ -0,0 +1,99 @@
+import threading
+from array import array
+from bisect import bisect_left
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .fragments import get_versions
+from .models import Follow, Profile, Recommendation
+
+PULL_AUTHORS_KEY = 'follow_graph:pull_authors'
+
+_local = OrderedDict()
+_lock = threading.Lock()
+
+
+def _get_local(user_id, version):
+    with _lock:
+        cached = _local.get(user_id)
+        if cached is None or cached[0] != version:
+            return None
+        _local.move_to_end(user_id)
+        return cached[1]
+
+
+def _set_local(user_id, version, author_ids):
+    with _lock:
+        _local[user_id] = (version, author_ids)
+        _local.move_to_end(user_id)
+        while len(_local) > settings.FOLLOW_GRAPH_LOCAL_SIZE:
+            _local.popitem(last=False)
+
+
+def get_following_ids(user_id):
+    """Отсортированный массив id авторов, на которых подписан пользователь.
+
+    Массив живет в памяти процесса и в общем кэше под версией области
+    follow:<id>, которую сбрасывает каждая подписка и отписка.
+    """
+    version = get_versions([f'follow:{user_id}'])[f'follow:{user_id}']
+    author_ids = _get_local(user_id, version)
+    if author_ids is not None:
+        return author_ids
+    key = f'follow_graph:{user_id}:{version}'
+    data = cache.get(key)
+    author_ids = array('q')
+    if data is None:
+        author_ids.extend(
+            Follow.objects.filter(user_id=user_id).order_by(
+                'author_id',
+            ).values_list('author_id', flat=True)
+        )
+        cache.set(key, author_ids.tobytes(), settings.CACHES_TIMEOUT_PAGE)
+    else:
+        author_ids.frombytes(data)
+    _set_local(user_id, version, author_ids)
+    return author_ids
+
+
+def is_following(user_id, author_id):
+    """Проверяем подписку двоичным поиском по массиву подписок."""
+    author_ids = get_following_ids(user_id)
+    index = bisect_left(author_ids, author_id)
+    return index < len(author_ids) and author_ids[index] == author_id
+
+
+def get_pull_authors():
+    """Авторы, посты которых не раскладываются по лентам.
+
+    Список обновляется раз в settings.FEED_PULL_AUTHORS_TIMEOUT секунд.
+    """
+    author_ids = cache.get(PULL_AUTHORS_KEY)
+    if author_ids is None:
+        author_ids = frozenset(Profile.objects.filter(
+            followers_count__gt=settings.FEED_FANOUT_MAX_FOLLOWERS,
+        ).values_list('user_id', flat=True))
+        cache.set(
+            PULL_AUTHORS_KEY, author_ids, settings.FEED_PULL_AUTHORS_TIMEOUT,
+        )
+    return author_ids
+
+
+def get_suggestions(user):
+    """Рекомендованные авторы для подписки одним запросом.
+
+    Рекомендации считает команда build_recommendations; авторов,
+    на которых пользователь подписался позже, отбрасываем по кэшу
+    подписок.
+    """
+    suggestions = Recommendation.objects.filter(user=user).select_related(
+        'author',
+    ).only(
+        'author__username', 'author__first_name', 'author__last_name',
+    ).order_by('-score')[:settings.RECOMMENDATIONS_PER_USER]
+    return [
+        suggestion.author for suggestion in suggestions
+        if not is_following(user.pk, suggestion.author_id)
+    ][:settings.RECOMMENDATIONS_SHOWN]
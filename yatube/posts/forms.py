@@ -1,8 +1,34 @@
 from django import forms
+from django.conf import settings
 
 from .models import Comment, Post
 
 
+class PostImageField(forms.ImageField):
+    """Картинка поста, проверенная по размеру файла и по размерам
+    из заголовка до декодирования."""
+
+    def to_python(self, data):
+        if getattr(data, 'oversized', False):
+            raise forms.ValidationError(
+                'Файл больше %(limit)s МБ.',
+                code='file_too_large',
+                params={'limit': settings.FILE_UPLOAD_MAX_SIZE // 2 ** 20},
+            )
+        image = super().to_python(data)
+        if image is not None:
+            width, height = image.image.size
+            if width * height > settings.IMAGE_UPLOAD_MAX_PIXELS:
+                raise forms.ValidationError(
+                    'Картинка больше %(limit)s мегапикселей.',
+                    code='image_too_large',
+                    params={
+                        'limit': settings.IMAGE_UPLOAD_MAX_PIXELS // 10 ** 6,
+                    },
+                )
+        return image
+
+
 class PostForm(forms.ModelForm):
     """Форма создания нового поста."""
 
@@ -15,6 +41,22 @@ class PostForm(forms.ModelForm):
             'А здесь можно выбрать группу'
         )
 
+    def save(self, commit=True):
+        """Запоминаем размеры новой картинки, чтобы шаблоны
+        не открывали файл."""
+        if 'image' in self.changed_data:
+            image = self.cleaned_data['image']
+            if image:
+                self.instance.image_width, self.instance.image_height = (
+                    image.image.size
+                )
+                self.instance.image_size = image.size
+            else:
+                self.instance.image_width = None
+                self.instance.image_height = None
+                self.instance.image_size = None
+        return super().save(commit)
+
     class Meta:
         model = Post
         fields = (
@@ -27,22 +69,33 @@ class PostForm(forms.ModelForm):
             'group': 'Группа',
             'image': 'Картика к посту',
         }
+        field_classes = {
+            'image': PostImageField,
+        }
 
 
 class CommentForm(forms.ModelForm):
     """Форма создания нового комментария."""
 
-    def __init__(self, *args, **kwargs):
+    def __init__(self, *args, post=None, **kwargs):
         super().__init__(*args, **kwargs)
         self.fields['text'].widget.attrs['placeholder'] = (
             'Напишите коммент, не стесняйтесь 😉'
         )
+        if post is not None:
+            self.fields['parent'].queryset = Comment.objects.filter(
+                post=post,
+            )
 
     class Meta:
         model = Comment
         fields = (
             'text',
+            'parent',
         )
+        widgets = {
+            'parent': forms.HiddenInput,
+        }
         labels = {
             'text': 'Текст коммента',
         }
@@ -0,0 +1,115 @@
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import prefetch_related_objects
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
+
+from .thumbnail_cache import prefetch_thumbnails
+
+CARD_TEMPLATE = 'includes/article.html'
+INVALIDATED_KEYS = 'cache_stats:invalidated_keys'
+INVALIDATING_WRITES = 'cache_stats:writes'
+
+
+def get_version_key(scope):
+    return f'version:{scope}'
+
+
+def get_versions(scopes):
+    """Версии областей кэша: index, group:<id>, profile:<id> и других.
+
+    Если версии нет в кэше, заводим ее от текущего времени, чтобы
+    не совпасть с версией фрагмента, пережившего вытеснение ключа версии.
+    """
+    keys = {get_version_key(scope): scope for scope in scopes}
+    versions = cache.get_many(keys)
+    missing = {key: int(time.time() * 1000) for key in keys
+               if key not in versions}
+    if missing:
+        cache.set_many(missing, None)
+        versions.update(missing)
+    return {keys[key]: version for key, version in versions.items()}
+
+
+def bump_versions(*scopes):
+    """Сбрасываем все закэшированные фрагменты областей."""
+    for scope in scopes:
+        try:
+            cache.incr(get_version_key(scope))
+        except ValueError:
+            cache.set(get_version_key(scope), int(time.time() * 1000), None)
+    _incr_stat(INVALIDATED_KEYS, len(scopes))
+    _incr_stat(INVALIDATING_WRITES, 1)
+
+
+def _incr_stat(key, delta):
+    try:
+        cache.incr(key, delta)
+    except ValueError:
+        cache.set(key, delta, None)
+
+
+def get_invalidation_stats():
+    """Сколько версий сброшено и сколькими записями в БД."""
+    stats = cache.get_many([INVALIDATED_KEYS, INVALIDATING_WRITES])
+    writes = stats.get(INVALIDATING_WRITES, 0)
+    keys = stats.get(INVALIDATED_KEYS, 0)
+    return {
+        'writes': writes,
+        'invalidated_keys': keys,
+        'keys_per_write': keys / writes if writes else 0,
+    }
+
+
+def get_page_cache(*scopes):
+    """Контекст для тега {% cache %}: время жизни и версия страницы."""
+    versions = get_versions(scopes)
+    return {
+        'cache_timeout': settings.CACHES_TIMEOUT_PAGE,
+        'cache_version': '.'.join(str(versions[scope]) for scope in scopes),
+    }
+
+
+def get_card_key(post, versions, flags):
+    variant = ''.join(
+        f'{name}={int(bool(value))};' for name, value in sorted(flags.items())
+    )
+    version = versions[f'post:{post.pk}']
+    if post.group_id:
+        version = f'{version}.{versions[f"group:{post.group_id}"]}'
+    return f'post_card:{post.pk}:{version}:{variant}'
+
+
+def render_post_cards(posts, **flags):
+    """Карточки постов ленты.
+
+    Версии постов и их групп, а затем готовые карточки достаем из кэша
+    через get_many, отсутствующие рендерим и кладем в кэш одним set_many.
+    Копии и миниатюры картинок ищутся пакетом и только для рендера.
+    """
+    posts = list(posts)
+    scopes = {f'post:{post.pk}' for post in posts}
+    scopes.update(
+        f'group:{post.group_id}' for post in posts if post.group_id
+    )
+    versions = get_versions(scopes)
+    keys = [get_card_key(post, versions, flags) for post in posts]
+    cards = cache.get_many(keys)
+    missing = [
+        post for key, post in zip(keys, posts)
+        if key not in cards and post.image
+    ]
+    prefetch_related_objects(missing, 'image_variants')
+    prefetch_thumbnails(missing)
+    rendered = {}
+    for key, post in zip(keys, posts):
+        if key not in cards:
+            rendered[key] = render_to_string(
+                CARD_TEMPLATE, {'post': post, **flags},
+            )
+    if rendered:
+        cache.set_many(rendered, settings.CACHES_TIMEOUT_PAGE)
+        cards.update(rendered)
+    return [mark_safe(cards[key]) for key in keys]
@@ -0,0 +1,141 @@
+import base64
+import os
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import transaction
+from PIL import Image, ImageFilter, ImageOps, features
+
+from .media import change_refs, replace_file, storage
+from .models import Post, PostImageVariant
+
+ORIGINAL_SAVE_OPTIONS = {
+    'JPEG': {'quality': 90, 'optimize': True, 'progressive': True},
+    'PNG': {'optimize': True},
+    'WEBP': {'quality': 90},
+}
+SAVE_OPTIONS = {
+    PostImageVariant.JPEG: {
+        'format': 'JPEG', 'quality': 80, 'optimize': True, 'progressive': True,
+    },
+    PostImageVariant.WEBP: {'format': 'WEBP', 'quality': 75, 'method': 4},
+}
+
+
+def get_formats():
+    """Форматы копий: WebP, только если Pillow собран с его поддержкой."""
+    if features.check('webp'):
+        return (PostImageVariant.WEBP, PostImageVariant.JPEG)
+    return (PostImageVariant.JPEG,)
+
+
+def get_variant_widths(source_width):
+    """Ширины копий не больше исходной, но хотя бы одна."""
+    widths = [
+        width for width in settings.IMAGE_VARIANT_WIDTHS
+        if width <= source_width
+    ]
+    return widths or settings.IMAGE_VARIANT_WIDTHS[:1]
+
+
+def _encode(image, image_format):
+    buffer = BytesIO()
+    image.save(buffer, **SAVE_OPTIONS[image_format])
+    return buffer.getvalue()
+
+
+def get_placeholder(image):
+    """Размытая копия в несколько пикселей в виде data: URI."""
+    width = settings.IMAGE_PLACEHOLDER_WIDTH
+    tiny = image.resize(
+        (width, max(round(width / settings.IMAGE_VARIANT_ASPECT), 1)),
+    ).filter(ImageFilter.GaussianBlur(1))
+    buffer = BytesIO()
+    tiny.save(buffer, format='JPEG', quality=40)
+    data = base64.b64encode(buffer.getvalue()).decode()
+    return f'data:image/jpeg;base64,{data}'
+
+
+def normalize_original(post_id, name):
+    """Уменьшаем оригинал до IMAGE_ORIGINAL_MAX_SIDE и убираем EXIF.
+
+    JPEG декодируется сразу в уменьшенном масштабе, чтобы не держать
+    в памяти полный растр. Новый файл сохраняется под именем по хэшу
+    и подменяет картинку поста, только если ее не успели заменить;
+    старый файл удалит сборщик мусора, когда на него не останется ссылок.
+    Возвращаем имя актуального оригинала.
+    """
+    max_side = settings.IMAGE_ORIGINAL_MAX_SIDE
+    with storage.open(name) as file:
+        image = Image.open(file)
+        image_format = image.format
+        if (
+            image_format not in ORIGINAL_SAVE_OPTIONS
+            or getattr(image, 'is_animated', False)
+            or (max(image.size) <= max_side and not image.getexif())
+        ):
+            return name
+        image.draft('RGB', (max_side, max_side))
+        image = ImageOps.exif_transpose(image)
+        image.thumbnail((max_side, max_side), Image.LANCZOS)
+    if image_format == 'JPEG':
+        image = image.convert('RGB')
+    buffer = BytesIO()
+    image.save(buffer, format=image_format, **ORIGINAL_SAVE_OPTIONS[
+        image_format
+    ])
+    new_name = storage.save(name, ContentFile(buffer.getvalue()))
+    with transaction.atomic():
+        if Post.objects.filter(pk=post_id, image=name).update(
+            image=new_name,
+            image_width=image.width,
+            image_height=image.height,
+            image_size=buffer.tell(),
+        ):
+            replace_file(name, new_name)
+            return new_name
+        change_refs(new_name, 0)
+    return name
+
+
+def make_image_variants(post_id, name):
+    """Готовим копии картинки поста всех ширин и заглушку и сохраняем
+    их описания, чтобы шаблоны строили srcset без обращения к файлам."""
+    with storage.open(name) as file:
+        image = ImageOps.exif_transpose(Image.open(file))
+        image = image.convert('RGB')
+    stem = os.path.splitext(os.path.basename(name))[0]
+    variants = []
+    for width in get_variant_widths(image.width):
+        height = round(width / settings.IMAGE_VARIANT_ASPECT)
+        resized = ImageOps.fit(image, (width, height), Image.LANCZOS)
+        for image_format in get_formats():
+            data = _encode(resized, image_format)
+            variant_name = default_storage.save(
+                f'variants/{post_id}/{stem}-{width}.{image_format}',
+                ContentFile(data),
+            )
+            variants.append(PostImageVariant(
+                post_id=post_id,
+                format=image_format,
+                width=width,
+                height=height,
+                name=variant_name,
+                size=len(data),
+            ))
+    stale_names = list(PostImageVariant.objects.filter(
+        post_id=post_id,
+    ).values_list('name', flat=True))
+    with transaction.atomic():
+        if Post.objects.filter(pk=post_id, image=name).update(
+            image_placeholder=get_placeholder(image),
+        ):
+            PostImageVariant.objects.filter(post_id=post_id).delete()
+            PostImageVariant.objects.bulk_create(variants)
+        else:
+            # Картинку поста успели заменить или пост удален.
+            stale_names = [variant.name for variant in variants]
+    for stale_name in stale_names:
+        default_storage.delete(stale_name)
@@ -0,0 +1,107 @@
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, F
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+from .models import LeaderboardEntry, Post, PostRating
+
+WINDOWS = {
+    LeaderboardEntry.DAY: timedelta(days=1),
+    LeaderboardEntry.WEEK: timedelta(days=7),
+    LeaderboardEntry.MONTH: timedelta(days=30),
+}
+GLOBAL_SCOPE = 'all'
+
+
+def get_scope(group_id=None):
+    """Область рейтинга: весь сайт или группа."""
+    return f'group:{group_id}' if group_id else GLOBAL_SCOPE
+
+
+def get_leaderboard(window, group_id=None):
+    """Лучшие посты области за период: выборка k строк по индексу."""
+    return LeaderboardEntry.objects.filter(
+        window=window,
+        scope=get_scope(group_id),
+        score__gt=0,
+    ).select_related('post').only(
+        'score', 'post__text',
+    ).order_by('-score', '-post_id')[:settings.LEADERBOARD_SIZE]
+
+
+def change_leaderboards(post_id, delta, rated_at=None):
+    """Учитываем поставленную или снятую оценку во всех периодах,
+    в которые попадает время оценки."""
+    now = timezone.now()
+    windows = [
+        window for window, span in WINDOWS.items()
+        if rated_at is None or rated_at >= now - span
+    ]
+    if not windows:
+        return
+    LeaderboardEntry.objects.filter(
+        post_id=post_id, window__in=windows,
+    ).update(score=Greatest(F('score') + delta, 0))
+    if delta <= 0:
+        return
+    group_id = Post.objects.filter(pk=post_id).values_list(
+        'group_id', flat=True,
+    ).first()
+    scopes = {GLOBAL_SCOPE, get_scope(group_id)}
+    LeaderboardEntry.objects.bulk_create(
+        [
+            LeaderboardEntry(
+                window=window, scope=scope, post_id=post_id, score=delta,
+            )
+            for window in windows
+            for scope in scopes
+        ],
+        ignore_conflicts=True,
+    )
+
+
+def compact_leaderboard(window, now=None):
+    """Пересчитываем период по оценкам, оставляя в каждой области
+    settings.LEADERBOARD_KEEP лучших постов.
+
+    Оценки считаются одним запросом с группировкой по посту и его
+    группе, а строки по убыванию счета раскладываются по областям.
+    """
+    since = (now or timezone.now()) - WINDOWS[window]
+    rows = PostRating.objects.filter(created__gte=since).values(
+        'post', 'post__group',
+    ).annotate(score=Count('pk')).order_by('-score', '-post')
+    kept = defaultdict(int)
+    entries = []
+    for row in rows.iterator():
+        for scope in {GLOBAL_SCOPE, get_scope(row['post__group'])}:
+            if kept[scope] < settings.LEADERBOARD_KEEP:
+                kept[scope] += 1
+                entries.append(LeaderboardEntry(
+                    window=window,
+                    scope=scope,
+                    post_id=row['post'],
+                    score=row['score'],
+                ))
+    with transaction.atomic():
+        LeaderboardEntry.objects.filter(window=window).delete()
+        LeaderboardEntry.objects.bulk_create(entries)
+    return len(entries)
+
+
+def get_leaderboard_context(request, group_id=None):
+    """Контекст блока лучших постов; период выбирается параметром top."""
+    window = request.GET.get('top')
+    if window not in WINDOWS:
+        window = LeaderboardEntry.DAY
+    return {
+        'leaderboard': get_leaderboard(window, group_id),
+        'leaderboard_scope': get_scope(group_id),
+        'leaderboard_window': window,
+        'leaderboard_windows': LeaderboardEntry.WINDOWS,
+        'leaderboard_timeout': settings.LEADERBOARD_CACHE_TIMEOUT,
+    }
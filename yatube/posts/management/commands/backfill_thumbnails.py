@@ -0,0 +1,56 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from posts.thumbnails import backfill_thumbnails
+
+
+class Command(BaseCommand):
+    help = (
+        'Готовит миниатюры и копии для srcset всех картинок постов, '
+        'например после смены размеров в шаблонах. Прерванный запуск '
+        'продолжается с последней обработанной части.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=200,
+            help='Сколько постов читать и обрабатывать за один шаг.',
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=None,
+            help='Сколько процессов обрабатывают картинки, '
+                 'по умолчанию settings.THUMBNAIL_WORKERS.',
+        )
+        parser.add_argument(
+            '--restart',
+            action='store_true',
+            help='Начать с первого поста, не продолжая прошлый запуск.',
+        )
+
+    def handle(self, *args, **options):
+        workers = options['workers']
+        if workers is None:
+            workers = settings.THUMBNAIL_WORKERS
+        done = failed = skipped = 0
+        seconds = 0.0
+        for chunk in backfill_thumbnails(
+            options['chunk_size'], workers, options['restart'],
+        ):
+            done += chunk['done']
+            failed += chunk['failed']
+            skipped += chunk['skipped']
+            seconds += chunk['seconds']
+            self.stdout.write(
+                f'До поста {chunk["last_pk"]}: готово {done}, '
+                f'ошибок {failed}, пропущено {skipped}, '
+                f'{chunk["done"] / max(chunk["seconds"], 1e-6):.1f} картинок/с'
+            )
+        self.stdout.write(
+            f'Миниатюры: готово {done}, ошибок {failed}, '
+            f'пропущено {skipped}, '
+            f'{done / max(seconds, 1e-6):.1f} картинок/с'
+        )
@@ -0,0 +1,159 @@
+import os
+import random
+import sqlite3
+import statistics
+import tempfile
+import time
+from collections import Counter
+from itertools import accumulate
+
+from django.core.management.base import BaseCommand
+
+from posts.search import (TOKENIZE, get_match_expression, get_ranked_params,
+                          get_ranked_sql)
+
+BATCH_SIZE = 10000
+VOCABULARY_SIZE = 50000
+SYLLABLES = (
+    'ка', 'ро', 'ми', 'ту', 'ле', 'на', 'во', 'си', 'да', 'пе',
+    'гу', 'ты', 'бо', 'ре', 'ша', 'жи', 'ло', 'зу', 'фе', 'хо',
+)
+SAMPLE_SIZE = 10000
+# Какие по частоте в выборке слова искать: частые, средние и редкие.
+BANDS = (('частые', 0), ('средние', 1000), ('редкие', 20000))
+
+
+def make_vocabulary(rng):
+    words = set()
+    while len(words) < VOCABULARY_SIZE:
+        words.add(''.join(rng.choices(SYLLABLES, k=rng.randint(2, 4))))
+    words = sorted(words)
+    rng.shuffle(words)
+    return words
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает задержку поиска FTS5 и LIKE на синтетических текстах '
+        'во временной БД SQLite со схемой и запросом индекса постов. '
+        'Пример: benchmark_search --rows 10000000.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--rows',
+            type=int,
+            default=1000000,
+            help='Сколько текстов сгенерировать.',
+        )
+        parser.add_argument(
+            '--words',
+            type=int,
+            default=30,
+            help='Сколько слов в одном тексте.',
+        )
+        parser.add_argument(
+            '--queries',
+            type=int,
+            default=5,
+            help='Сколько запросов выполнить для каждой частоты слов.',
+        )
+        parser.add_argument(
+            '--path',
+            help='Файл БД. По умолчанию временный, удаляется после замера.',
+        )
+        parser.add_argument('--seed', type=int, default=1)
+
+    def handle(self, *args, **options):
+        path = options['path']
+        temporary = path is None
+        if temporary:
+            handle, path = tempfile.mkstemp(suffix='.sqlite3')
+            os.close(handle)
+        db = sqlite3.connect(path)
+        try:
+            rng = random.Random(options['seed'])
+            if not db.execute(
+                "SELECT 1 FROM sqlite_master WHERE name = 'docs'"
+            ).fetchone():
+                self.fill(db, rng, make_vocabulary(rng), options)
+            self.measure(db, rng, options['queries'])
+        finally:
+            db.close()
+            if temporary:
+                os.remove(path)
+
+    def fill(self, db, rng, vocabulary, options):
+        db.execute('PRAGMA journal_mode=WAL')
+        db.execute('PRAGMA synchronous=OFF')
+        db.execute('CREATE TABLE docs (id INTEGER PRIMARY KEY, text TEXT)')
+        # Частоты слов убывают по закону Ципфа, как в живых текстах.
+        weights = [1 / rank for rank in range(1, len(vocabulary) + 1)]
+        cum_weights = list(accumulate(weights))
+        started = time.monotonic()
+        rows = options['rows']
+        for start in range(0, rows, BATCH_SIZE):
+            db.executemany(
+                'INSERT INTO docs (text) VALUES (?)',
+                (
+                    (' '.join(rng.choices(
+                        vocabulary, cum_weights=cum_weights,
+                        k=options['words'],
+                    )),)
+                    for _ in range(min(BATCH_SIZE, rows - start))
+                ),
+            )
+            db.commit()
+        self.stdout.write(
+            f'Тексты: {rows} за {time.monotonic() - started:.0f} с'
+        )
+        started = time.monotonic()
+        db.execute(
+            f"CREATE VIRTUAL TABLE docs_fts USING fts5(text, "
+            f"content='docs', content_rowid='id', tokenize='{TOKENIZE}')"
+        )
+        db.execute("INSERT INTO docs_fts(docs_fts) VALUES ('rebuild')")
+        db.execute("INSERT INTO docs_fts(docs_fts) VALUES ('optimize')")
+        db.commit()
+        self.stdout.write(
+            f'Индекс FTS5: {time.monotonic() - started:.0f} с'
+        )
+
+    def timed(self, db, sql, params):
+        started = time.perf_counter()
+        db.execute(sql.replace('%s', '?'), params).fetchall()
+        return (time.perf_counter() - started) * 1000
+
+    def measure(self, db, rng, queries):
+        frequency = Counter()
+        for text, in db.execute(
+            'SELECT text FROM docs ORDER BY id DESC LIMIT ?', (SAMPLE_SIZE,),
+        ):
+            frequency.update(text.split())
+        words = [word for word, _ in frequency.most_common()]
+        self.stdout.write(
+            'Первая страница из 10 результатов, медиана и максимум, мс'
+        )
+        for band, rank in BANDS:
+            fts, like = [], []
+            for _ in range(queries):
+                word = words[min(
+                    rank + rng.randrange(max(rank // 10, 10)), len(words) - 1,
+                )]
+                fts.append(self.timed(
+                    db,
+                    f'{get_ranked_sql("post", "docs_fts")} '
+                    'ORDER BY rank LIMIT 10',
+                    get_ranked_params(get_match_expression(word)),
+                ))
+                like.append(self.timed(
+                    db,
+                    'SELECT id, text FROM docs WHERE text LIKE ? '
+                    'ORDER BY id DESC LIMIT 10',
+                    (f'%{word}%',),
+                ))
+            self.stdout.write(
+                f'{band} слова: FTS5 {statistics.median(fts):.1f} / '
+                f'{max(fts):.1f}, LIKE {statistics.median(like):.1f} / '
+                f'{max(like):.1f}'
+            )
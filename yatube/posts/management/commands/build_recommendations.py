@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+
+from posts.recommendations import compute_recommendations, save_recommendations
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересчитывает рекомендации авторов для подписки по графу подписок. '
+        'Запускается по расписанию, например раз в сутки.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=10000,
+            help='Сколько строк читать и сколько пользователей считать '
+                 'за один шаг.',
+        )
+        parser.add_argument(
+            '--with-ratings',
+            action='store_true',
+            help='Учитывать оценки постов как слабые подписки.',
+        )
+
+    def handle(self, *args, **options):
+        total = save_recommendations(compute_recommendations(
+            options['chunk_size'], options['with_ratings'],
+        ))
+        self.stdout.write(f'Рекомендации: записано {total}')
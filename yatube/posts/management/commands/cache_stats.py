@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from posts.fragments import get_invalidation_stats
+
+
+class Command(BaseCommand):
+    help = 'Показывает, сколько ключей кэша сбрасывает одна запись в БД.'
+
+    def handle(self, *args, **options):
+        stats = get_invalidation_stats()
+        self.stdout.write(
+            f'Записей: {stats["writes"]}, '
+            f'сброшено ключей: {stats["invalidated_keys"]}, '
+            f'ключей на запись: {stats["keys_per_write"]:.2f}'
+        )
@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand
+
+from posts.media import collect_garbage, find_orphans, storage
+
+
+class Command(BaseCommand):
+    help = (
+        'Удаляет файлы картинок, на которые не ссылается ни один пост. '
+        'Запускается по расписанию, например раз в сутки.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--grace',
+            type=int,
+            default=None,
+            help='Сколько секунд хранить файл без ссылок, '
+                 'по умолчанию settings.MEDIA_GC_GRACE.',
+        )
+        parser.add_argument(
+            '--orphans',
+            action='store_true',
+            help='Обойти каталоги и удалить файлы, не стоящие на учете.',
+        )
+
+    def handle(self, *args, **options):
+        total = collect_garbage(options['grace'])
+        self.stdout.write(f'Файлы без ссылок: удалено {total}')
+        if options['orphans']:
+            orphans = 0
+            for name in find_orphans(grace=options['grace']):
+                storage.delete(name)
+                orphans += 1
+            self.stdout.write(f'Файлы вне учета: удалено {orphans}')
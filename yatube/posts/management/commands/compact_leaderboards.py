@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from posts.leaderboards import WINDOWS, compact_leaderboard
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересчитывает таблицы лучших постов по оценкам за период. '
+        'Запускается по расписанию, например раз в час.'
+    )
+
+    def handle(self, *args, **options):
+        for window in WINDOWS:
+            total = compact_leaderboard(window)
+            self.stdout.write(f'{window}: записей {total}')
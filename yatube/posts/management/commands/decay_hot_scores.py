@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from posts.ranking import decay_hot_scores
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересчитывает популярность свежих постов с учетом их возраста. '
+        'Запускается по расписанию, например раз в 10 минут.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=1000,
+            help='Сколько постов обновлять за один запрос.',
+        )
+
+    def handle(self, *args, **options):
+        total = decay_hot_scores(options['chunk_size'])
+        self.stdout.write(f'Посты: пересчитано {total}')
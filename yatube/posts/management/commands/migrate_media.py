@@ -0,0 +1,43 @@
+from django.core.management.base import BaseCommand
+
+from posts.media import migrate_file, storage
+from posts.models import Post
+
+
+class Command(BaseCommand):
+    help = (
+        'Переносит картинки постов из плоского каталога posts/ '
+        'в хранилище по хэшу содержимого. Прерванный перенос можно '
+        'запустить заново: перенесенные картинки пропускаются.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=500,
+            help='Сколько постов читать за один запрос.',
+        )
+
+    def handle(self, *args, **options):
+        migrated = missing = 0
+        last_pk = 0
+        while True:
+            chunk = list(Post.objects.filter(pk__gt=last_pk).exclude(
+                image='',
+            ).order_by('pk').values_list('pk', 'image')[
+                :options['chunk_size']
+            ])
+            if not chunk:
+                break
+            last_pk = chunk[-1][0]
+            for post_id, name in chunk:
+                if storage.is_hashed(name):
+                    continue
+                if migrate_file(post_id, name) is None:
+                    missing += 1
+                else:
+                    migrated += 1
+        self.stdout.write(
+            f'Картинки: перенесено {migrated}, пропущено {missing}'
+        )
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from posts.feed import backfill_feed
+from posts.models import FeedEntry, Follow
+
+
+class Command(BaseCommand):
+    help = 'Заново собирает ленты подписок из таблицы подписок.'
+
+    def handle(self, *args, **options):
+        FeedEntry.objects.all().delete()
+        follows = Follow.objects.select_related('user', 'author')
+        total = 0
+        for follow in follows.iterator():
+            backfill_feed(follow.user, follow.author)
+            total += 1
+        self.stdout.write(f'Обработано подписок: {total}')
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from posts.search import rebuild_index
+
+
+class Command(BaseCommand):
+    help = (
+        'Перестраивает полнотекстовые индексы постов и комментариев '
+        'из таблиц моделей, например после восстановления БД из копии.'
+    )
+
+    def handle(self, *args, **options):
+        rebuild_index()
+        self.stdout.write('Поисковые индексы перестроены')
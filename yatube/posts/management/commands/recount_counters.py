@@ -0,0 +1,46 @@
+from django.core.management.base import BaseCommand
+
+from posts.counters import (recount_groups, recount_posts,
+                            recount_posts_total, recount_profiles)
+from posts.models import Group, Post, User
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересчитывает счетчики постов, групп и профилей по частям '
+        'и общее количество постов.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=1000,
+            help='Сколько строк пересчитывать за один запрос.',
+        )
+
+    def handle(self, *args, **options):
+        chunk_size = options['chunk_size']
+        for model, recount in (
+            (Post, recount_posts),
+            (Group, recount_groups),
+            (User, recount_profiles),
+        ):
+            total = 0
+            last_pk = 0
+            while True:
+                chunk = list(
+                    model.objects.filter(pk__gt=last_pk).order_by(
+                        'pk',
+                    ).values_list('pk', flat=True)[:chunk_size]
+                )
+                if not chunk:
+                    break
+                recount(model.objects.filter(pk__in=chunk))
+                total += len(chunk)
+                last_pk = chunk[-1]
+            self.stdout.write(
+                f'{model._meta.verbose_name_plural}: пересчитано {total}'
+            )
+        recount_posts_total()
+        self.stdout.write('Общее количество постов пересчитано')
@@ -0,0 +1,123 @@
+import posixpath
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+from .fragments import bump_versions
+from .models import MediaFile, Post
+
+storage = Post._meta.get_field('image').storage
+
+
+def change_refs(name, delta):
+    """Меняем число ссылок на файл, заводя его учет при первом обращении.
+
+    С delta = 0 файл только ставится на учет, чтобы сборщик мусора
+    удалил его, если ссылки так и не появятся.
+    """
+    if not name:
+        return
+    MediaFile.objects.get_or_create(name=name)
+    MediaFile.objects.filter(name=name).update(
+        refs=Greatest(F('refs') + delta, 0),
+        changed=timezone.now(),
+    )
+
+
+def replace_file(old_name, new_name):
+    """Переносим ссылку поста со старого файла на новый."""
+    if old_name != new_name:
+        change_refs(new_name, 1)
+        change_refs(old_name, -1)
+
+
+def collect_garbage(grace=None):
+    """Удаляем файлы без ссылок, не менявшиеся дольше grace секунд.
+
+    Файл, который только что загрузили повторно, имеет свежее время
+    изменения и переживает сборку. Учет ссылок и время изменения
+    проверяются в транзакции, которая первой удаляет строку учета:
+    ссылка параллельной загрузки ждет ее фиксации. Возвращаем число
+    удаленных файлов.
+    """
+    if grace is None:
+        grace = settings.MEDIA_GC_GRACE
+    cutoff = timezone.now() - timedelta(seconds=grace)
+    names = MediaFile.objects.filter(
+        refs=0, changed__lt=cutoff,
+    ).values_list('name', flat=True)
+    deleted = 0
+    for name in list(names):
+        with transaction.atomic():
+            if not MediaFile.objects.filter(
+                name=name, refs=0, changed__lt=cutoff,
+            ).delete()[0]:
+                continue
+            if (
+                storage.exists(name)
+                and storage.get_modified_time(name) >= cutoff
+            ):
+                transaction.set_rollback(True)
+                continue
+            storage.delete(name)
+        deleted += 1
+    return deleted
+
+
+def find_orphans(directory='posts', grace=None):
+    """Файлы в каталогах хэшей, о которых не знает учет ссылок.
+
+    Такие файлы остаются, например, от поста, сохранение которого
+    прервалось после записи картинки. Обходим каталоги по одному
+    и сверяем их содержимое с учетом одним запросом на каталог.
+    """
+    if grace is None:
+        grace = settings.MEDIA_GC_GRACE
+    cutoff = timezone.now() - timedelta(seconds=grace)
+    if not storage.exists(directory):
+        return
+    for first in storage.listdir(directory)[0]:
+        for second in storage.listdir(posixpath.join(directory, first))[0]:
+            path = posixpath.join(directory, first, second)
+            names = {
+                posixpath.join(path, filename)
+                for filename in storage.listdir(path)[1]
+            }
+            names -= set(MediaFile.objects.filter(
+                name__in=names,
+            ).values_list('name', flat=True))
+            for name in sorted(names):
+                if (
+                    storage.is_hashed(name)
+                    and storage.get_modified_time(name) < cutoff
+                ):
+                    yield name
+
+
+def migrate_file(post_id, name):
+    """Переносим картинку поста из плоского каталога в хранилище по хэшу.
+
+    Файл читается и копируется по частям. Старый файл удаляется, когда
+    на него не ссылается ни один пост. Возвращаем новое имя или None,
+    если файла нет или картинку поста успели заменить.
+    """
+    if not storage.exists(name):
+        return None
+    with storage.open(name) as file:
+        new_name = storage.save(name, file)
+    with transaction.atomic():
+        if not Post.objects.filter(pk=post_id, image=name).update(
+            image=new_name,
+        ):
+            change_refs(new_name, 0)
+            return None
+        replace_file(name, new_name)
+    bump_versions(f'post:{post_id}')
+    if not Post.objects.filter(image=name).exists():
+        storage.delete(name)
+        MediaFile.objects.filter(name=name).delete()
+    return new_name
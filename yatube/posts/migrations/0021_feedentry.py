@@ -0,0 +1,80 @@
+# Generated by Django 2.2.19 on 2026-10-18 02:17
+
+from itertools import groupby
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+from django.db.models import Count
+
+
+def fill_feeds(apps, schema_editor):
+    """Собираем ленты существующих подписок, как posts.feed.backfill_feed:
+    последние FEED_MAX_ENTRIES постов авторов подписок, кроме авторов,
+    чьи посты подмешиваются при чтении."""
+    Follow = apps.get_model('posts', 'Follow')
+    Post = apps.get_model('posts', 'Post')
+    FeedEntry = apps.get_model('posts', 'FeedEntry')
+    pull_authors = set(
+        Follow.objects.order_by().values('author').annotate(
+            total=Count('pk'),
+        ).filter(
+            total__gt=settings.FEED_FANOUT_MAX_FOLLOWERS,
+        ).values_list('author', flat=True)
+    )
+    follows = Follow.objects.exclude(author__in=pull_authors).order_by(
+        'user',
+    ).values_list('user', 'author')
+    for user_id, rows in groupby(follows.iterator(), key=lambda row: row[0]):
+        posts = Post.objects.filter(
+            author__in=[author_id for _, author_id in rows],
+        ).order_by('-created', '-pk').values_list(
+            'pk', 'author', 'created',
+        )[:settings.FEED_MAX_ENTRIES]
+        FeedEntry.objects.bulk_create([
+            FeedEntry(
+                user_id=user_id,
+                post_id=post_id,
+                author_id=author_id,
+                created=created,
+            )
+            for post_id, author_id, created in posts
+        ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('posts', '0020_auto_20221128_1526'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FeedEntry',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created', models.DateTimeField(verbose_name='Дата публикации поста')),
+                ('author', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL, verbose_name='Автор поста')),
+                ('post', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='feed_entries', to='posts.Post', verbose_name='Пост в ленте')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='feed_entries', to=settings.AUTH_USER_MODEL, verbose_name='Владелец ленты')),
+            ],
+            options={
+                'verbose_name': 'Запись ленты',
+                'verbose_name_plural': 'Записи ленты',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='feedentry',
+            index=models.Index(fields=['user', '-created'], name='feed_user_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='feedentry',
+            index=models.Index(fields=['user', 'author'], name='feed_user_author_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='feedentry',
+            constraint=models.UniqueConstraint(fields=('user', 'post'), name='unique_feed_entry'),
+        ),
+        migrations.RunPython(fill_feeds, migrations.RunPython.noop),
+    ]
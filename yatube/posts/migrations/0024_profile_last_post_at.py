@@ -0,0 +1,34 @@
+# Generated by Django 2.2.19 on 2026-10-18 02:25
+
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def fill_last_post_at(apps, schema_editor):
+    Post = apps.get_model('posts', 'Post')
+    Profile = apps.get_model('posts', 'Profile')
+    Profile.objects.update(last_post_at=Subquery(
+        Post.objects.filter(author=OuterRef('user')).order_by(
+            '-created',
+        ).values('created')[:1]
+    ))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0023_counter'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='profile',
+            name='last_post_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Дата последнего поста'),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['author', '-created'], name='post_author_created_idx'),
+        ),
+        migrations.RunPython(fill_last_post_at, migrations.RunPython.noop),
+    ]
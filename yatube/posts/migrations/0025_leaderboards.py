@@ -0,0 +1,56 @@
+# Generated by Django 2.2.19 on 2026-10-18 02:27
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+from django.db.models import OuterRef, Subquery
+
+
+def fill_rating_created(apps, schema_editor):
+    # Время старых оценок неизвестно. Берем время поста: оценка не может
+    # быть раньше него, и старые оценки не попадают в рейтинги за
+    # сутки, неделю и месяц как поставленные в день миграции.
+    Post = apps.get_model('posts', 'Post')
+    PostRating = apps.get_model('posts', 'PostRating')
+    PostRating.objects.update(created=Subquery(
+        Post.objects.filter(pk=OuterRef('post_id')).values('created')[:1]
+    ))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0024_profile_last_post_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='postrating',
+            name='created',
+            field=models.DateTimeField(auto_now_add=True, default=django.utils.timezone.now, verbose_name='Дата публикации'),
+            preserve_default=False,
+        ),
+        migrations.RunPython(fill_rating_created, migrations.RunPython.noop),
+        migrations.CreateModel(
+            name='LeaderboardEntry',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('window', models.CharField(choices=[('day', 'За сутки'), ('week', 'За неделю'), ('month', 'За месяц')], max_length=5, verbose_name='Период')),
+                ('scope', models.CharField(help_text='all или group:<id> группы', max_length=50, verbose_name='Область')),
+                ('score', models.PositiveIntegerField(default=0, verbose_name='Оценок за период')),
+                ('post', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='leaderboard_entries', to='posts.Post', verbose_name='Пост')),
+            ],
+            options={
+                'verbose_name': 'Место в рейтинге',
+                'verbose_name_plural': 'Места в рейтинге',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='leaderboardentry',
+            index=models.Index(fields=['window', 'scope', '-score'], name='leaderboard_top_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='leaderboardentry',
+            constraint=models.UniqueConstraint(fields=('window', 'scope', 'post'), name='unique_leaderboard_entry'),
+        ),
+    ]
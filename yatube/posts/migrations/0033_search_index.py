@@ -0,0 +1,53 @@
+from django.db import migrations
+
+# Полнотекстовые индексы FTS5 над текстами постов и комментариев.
+# Индексы хранят только токены, сам текст читается из таблиц моделей.
+# Триггеры держат индексы в актуальном состоянии при любых изменениях,
+# включая QuerySet.update() и bulk_create(). Миграция, пересоздающая
+# таблицу posts_post или posts_comment, удалит триггеры: их нужно
+# создать заново и перестроить индекс командой rebuild_search_index.
+# Пропавшие триггеры находит проверка posts.W001 перед migrate.
+TABLES = (
+    ('posts_post', 'posts_post_fts'),
+    ('posts_comment', 'posts_comment_fts'),
+)
+
+
+def get_create_sql(table, index):
+    return [
+        f"CREATE VIRTUAL TABLE {index} USING fts5(text, "
+        f"content='{table}', content_rowid='id', "
+        f"tokenize='unicode61 remove_diacritics 2')",
+        f"CREATE TRIGGER {index}_insert AFTER INSERT ON {table} BEGIN "
+        f"INSERT INTO {index}(rowid, text) VALUES (new.id, new.text); END",
+        f"CREATE TRIGGER {index}_delete AFTER DELETE ON {table} BEGIN "
+        f"INSERT INTO {index}({index}, rowid, text) "
+        f"VALUES ('delete', old.id, old.text); END",
+        f"CREATE TRIGGER {index}_update AFTER UPDATE OF text ON {table} "
+        f"BEGIN "
+        f"INSERT INTO {index}({index}, rowid, text) "
+        f"VALUES ('delete', old.id, old.text); "
+        f"INSERT INTO {index}(rowid, text) VALUES (new.id, new.text); END",
+        f"INSERT INTO {index}({index}) VALUES ('rebuild')",
+    ]
+
+
+def get_drop_sql(table, index):
+    return [
+        f'DROP TRIGGER IF EXISTS {index}_{event}'
+        for event in ('insert', 'delete', 'update')
+    ] + [f'DROP TABLE IF EXISTS {index}']
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0032_media_files'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            get_create_sql(table, index), get_drop_sql(table, index),
+        )
+        for table, index in TABLES
+    ]
@@ -2,9 +2,12 @@ from django.contrib.auth import get_user_model
 from django.db import models
 
 from core.models import CreatedModel
+from core.storages import ContentAddressedStorage
 
 User = get_user_model()
 ADMINS_POST_LENGHT = 15
+COMMENT_MAX_DEPTH = 8
+COMMENT_PATH_STEP = 10
 
 
 class Group(models.Model):
@@ -20,6 +23,11 @@ class Group(models.Model):
         unique=True,
     )
     description = models.TextField(verbose_name='Описание')
+    posts_count = models.PositiveIntegerField(
+        verbose_name='Количество постов',
+        default=0,
+        editable=False,
+    )
 
     class Meta:
         ordering = ('title',)
@@ -31,6 +39,27 @@ class Group(models.Model):
         return self.title
 
 
+class PostQuerySet(models.QuerySet):
+    """Получаем выборки постов."""
+
+    def for_feed(self):
+        """Посты для карточек ленты: только нужные шаблону поля,
+        автор и группа подтягиваются тем же запросом."""
+        return self.select_related('author', 'group').only(
+            'text',
+            'created',
+            'image',
+            'image_width',
+            'image_height',
+            'image_placeholder',
+            'hot_score',
+            'author__username',
+            'author__first_name',
+            'author__last_name',
+            'group__slug',
+        )
+
+
 class Post(CreatedModel):
     """Получаем модель Поста."""
 
@@ -56,12 +85,64 @@ class Post(CreatedModel):
     image = models.ImageField(
         verbose_name='Картинка',
         upload_to='posts/',
+        storage=ContentAddressedStorage(),
         blank=True,
         help_text='Загрузите картинку, если желаете',
     )
+    image_width = models.PositiveIntegerField(
+        verbose_name='Ширина картинки',
+        blank=True,
+        null=True,
+        editable=False,
+    )
+    image_height = models.PositiveIntegerField(
+        verbose_name='Высота картинки',
+        blank=True,
+        null=True,
+        editable=False,
+    )
+    image_size = models.PositiveIntegerField(
+        verbose_name='Размер картинки в байтах',
+        blank=True,
+        null=True,
+        editable=False,
+    )
+    image_placeholder = models.TextField(
+        verbose_name='Заглушка картинки',
+        blank=True,
+        editable=False,
+        help_text='Размытая картинка в несколько пикселей в виде data: URI',
+    )
+    rating_count = models.PositiveIntegerField(
+        verbose_name='Количество оценок',
+        default=0,
+        editable=False,
+    )
+    comments_count = models.PositiveIntegerField(
+        verbose_name='Количество комментариев',
+        default=0,
+        editable=False,
+    )
+    hot_score = models.FloatField(
+        verbose_name='Популярность',
+        default=0,
+        editable=False,
+    )
+
+    objects = PostQuerySet.as_manager()
 
     class Meta:
         ordering = ('-created',)
+        indexes = [
+            models.Index(
+                fields=['author', '-created'],
+                name='post_author_created_idx',
+            ),
+            models.Index(
+                fields=['-hot_score', '-id'],
+                name='post_hot_idx',
+            ),
+        ]
         verbose_name = 'Пост'
         verbose_name_plural = 'Посты'
 
@@ -74,6 +155,61 @@ class Post(CreatedModel):
         )
 
 
+class PostImageVariant(models.Model):
+    """Получаем модель уменьшенной копии картинки поста."""
+
+    WEBP = 'webp'
+    JPEG = 'jpeg'
+    FORMATS = (
+        (WEBP, 'WebP'),
+        (JPEG, 'JPEG'),
+    )
+
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='image_variants',
+        verbose_name='Пост',
+    )
+    format = models.CharField(
+        verbose_name='Формат',
+        max_length=4,
+        choices=FORMATS,
+    )
+    width = models.PositiveIntegerField(
+        verbose_name='Ширина',
+    )
+    height = models.PositiveIntegerField(
+        verbose_name='Высота',
+    )
+    name = models.CharField(
+        verbose_name='Файл',
+        max_length=255,
+    )
+    size = models.PositiveIntegerField(
+        verbose_name='Размер в байтах',
+    )
+
+    class Meta:
+        ordering = ('format', 'width')
+        constraints = [
+            models.UniqueConstraint(
+                fields=[
+                    'post',
+                    'format',
+                    'width',
+                ],
+                name='unique_post_image_variant',
+            )
+        ]
+        verbose_name = 'Копия картинки'
+        verbose_name_plural = 'Копии картинок'
+
+    def __str__(self):
+        """Возвращаем файл копии картинки."""
+        return self.name
+
+
 class Comment(CreatedModel):
     """Получаем модель для написания комментариев."""
 
@@ -95,9 +231,56 @@ class Comment(CreatedModel):
         verbose_name='Текст коммментария',
         help_text='Текст комментария',
     )
+    parent = models.ForeignKey(
+        'self',
+        blank=True,
+        null=True,
+        on_delete=models.CASCADE,
+        related_name='replies',
+        verbose_name='Ответ на комментарий',
+    )
+    root = models.ForeignKey(
+        'self',
+        blank=True,
+        null=True,
+        on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name='Начало ветки',
+    )
+    depth = models.PositiveSmallIntegerField(
+        verbose_name='Глубина в ветке',
+        default=0,
+        editable=False,
+    )
+    path = models.CharField(
+        verbose_name='Путь в ветке',
+        max_length=(COMMENT_PATH_STEP + 1) * (COMMENT_MAX_DEPTH + 1),
+        blank=True,
+        editable=False,
+        help_text='Номера предков и самого комментария через /',
+    )
+    replies_count = models.PositiveIntegerField(
+        verbose_name='Ответов в ветке',
+        default=0,
+        editable=False,
+    )
 
     class Meta:
         ordering = ('-created',)
+        indexes = [
+            models.Index(
+                fields=['post', 'parent', '-created'],
+                name='comment_post_parent_idx',
+            ),
+            models.Index(
+                fields=['root', 'path'],
+                name='comment_root_path_idx',
+            ),
+            models.Index(
+                fields=['path'],
+                name='comment_path_idx',
+            ),
+        ]
         verbose_name = 'Комментарий'
         verbose_name_plural = 'Комментарии'
 
@@ -146,10 +329,9 @@ class Follow(models.Model):
         )
 
 
-class PostRating(models.Model):
+class PostRating(CreatedModel):
     """Получаем модель оценки постов."""
 
-
     post = models.ForeignKey(
         Post,
         verbose_name='Оцениваемый пост',
@@ -181,3 +363,249 @@ class PostRating(models.Model):
         return (
             f'{self.user} оценил {self.post}'
         )
+
+
+class Counter(models.Model):
+    """Получаем модель именованного счетчика."""
+
+    name = models.CharField(
+        verbose_name='Название',
+        max_length=50,
+        unique=True,
+    )
+    value = models.PositiveIntegerField(
+        verbose_name='Значение',
+        default=0,
+    )
+
+    class Meta:
+        verbose_name = 'Счетчик'
+        verbose_name_plural = 'Счетчики'
+
+    def __str__(self):
+        """Возвращаем название и значение счетчика."""
+        return f'{self.name}: {self.value}'
+
+
+class MediaFile(models.Model):
+    """Получаем модель файла картинки и числа постов, ссылающихся на него."""
+
+    name = models.CharField(
+        verbose_name='Имя файла',
+        max_length=255,
+        unique=True,
+    )
+    refs = models.PositiveIntegerField(
+        verbose_name='Число ссылок',
+        default=0,
+    )
+    changed = models.DateTimeField(
+        verbose_name='Дата изменения',
+        auto_now=True,
+    )
+
+    class Meta:
+        verbose_name = 'Файл картинки'
+        verbose_name_plural = 'Файлы картинок'
+        indexes = (
+            models.Index(
+                fields=('refs', 'changed'),
+                name='media_file_garbage_idx',
+            ),
+        )
+
+    def __str__(self):
+        """Возвращаем имя файла и число ссылок."""
+        return f'{self.name}: {self.refs}'
+
+
+class LeaderboardEntry(models.Model):
+    """Получаем модель записи в таблице лучших постов за период."""
+
+    DAY = 'day'
+    WEEK = 'week'
+    MONTH = 'month'
+    WINDOWS = (
+        (DAY, 'За сутки'),
+        (WEEK, 'За неделю'),
+        (MONTH, 'За месяц'),
+    )
+
+    window = models.CharField(
+        verbose_name='Период',
+        max_length=5,
+        choices=WINDOWS,
+    )
+    scope = models.CharField(
+        verbose_name='Область',
+        max_length=50,
+        help_text='all или group:<id> группы',
+    )
+    post = models.ForeignKey(
+        Post,
+        verbose_name='Пост',
+        related_name='leaderboard_entries',
+        on_delete=models.CASCADE,
+    )
+    score = models.PositiveIntegerField(
+        verbose_name='Оценок за период',
+        default=0,
+    )
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=[
+                    'window',
+                    'scope',
+                    'post',
+                ],
+                name='unique_leaderboard_entry',
+            )
+        ]
+        indexes = [
+            models.Index(
+                fields=['window', 'scope', '-score'],
+                name='leaderboard_top_idx',
+            ),
+        ]
+        verbose_name = 'Место в рейтинге'
+        verbose_name_plural = 'Места в рейтинге'
+
+    def __str__(self):
+        """Возвращаем читаемую запись рейтинга."""
+        return f'{self.post}: {self.score} ({self.window}, {self.scope})'
+
+
+class Profile(models.Model):
+    """Получаем модель счетчиков пользователя."""
+
+    user = models.OneToOneField(
+        User,
+        verbose_name='Пользователь',
+        related_name='profile',
+        on_delete=models.CASCADE,
+    )
+    posts_count = models.PositiveIntegerField(
+        verbose_name='Количество постов',
+        default=0,
+    )
+    followers_count = models.PositiveIntegerField(
+        verbose_name='Количество подписчиков',
+        default=0,
+    )
+    following_count = models.PositiveIntegerField(
+        verbose_name='Количество подписок',
+        default=0,
+    )
+    last_post_at = models.DateTimeField(
+        verbose_name='Дата последнего поста',
+        blank=True,
+        null=True,
+    )
+
+    class Meta:
+        verbose_name = 'Профиль'
+        verbose_name_plural = 'Профили'
+
+    def __str__(self):
+        """Возвращаем имя пользователя профиля."""
+        return str(self.user)
+
+
+class FeedEntry(models.Model):
+    """Получаем модель записи в ленте подписок пользователя."""
+
+    user = models.ForeignKey(
+        User,
+        verbose_name='Владелец ленты',
+        related_name='feed_entries',
+        on_delete=models.CASCADE,
+    )
+    post = models.ForeignKey(
+        Post,
+        verbose_name='Пост в ленте',
+        related_name='feed_entries',
+        on_delete=models.CASCADE,
+    )
+    author = models.ForeignKey(
+        User,
+        verbose_name='Автор поста',
+        related_name='+',
+        on_delete=models.CASCADE,
+    )
+    created = models.DateTimeField(
+        verbose_name='Дата публикации поста',
+    )
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=[
+                    'user',
+                    'post',
+                ],
+                name='unique_feed_entry',
+            )
+        ]
+        indexes = [
+            models.Index(
+                fields=['user', '-created'],
+                name='feed_user_created_idx',
+            ),
+            models.Index(
+                fields=['user', 'author'],
+                name='feed_user_author_idx',
+            ),
+        ]
+        verbose_name = 'Запись ленты'
+        verbose_name_plural = 'Записи ленты'
+
+    def __str__(self):
+        """Возвращаем читаемую связку записи ленты."""
+        return (
+            f'{self.post} в ленте {self.user}'
+        )
+
+
+class Recommendation(models.Model):
+    """Получаем модель рекомендации автора для подписки."""
+
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='recommendations',
+        verbose_name='Пользователь',
+    )
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name='Рекомендуемый автор',
+    )
+    score = models.FloatField(
+        verbose_name='Сходство',
+    )
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=[
+                    'user',
+                    'author',
+                ],
+                name='unique_recommendation',
+            )
+        ]
+        indexes = [
+            models.Index(
+                fields=['user', '-score'],
+                name='recommendation_user_idx',
+            ),
+        ]
+        verbose_name = 'Рекомендация'
+        verbose_name_plural = 'Рекомендации'
+
+    def __str__(self):
+        """Возвращаем читаемую рекомендацию."""
+        return f'{self.user} -> {self.author}: {self.score:.3f}'
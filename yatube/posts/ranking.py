@@ -0,0 +1,55 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+
+from .models import Post
+
+HOT_KEYSET = ('hot_score', 'pk')
+
+
+def get_hot_score(rating_count, created, now=None):
+    """Популярность поста: оценки, затухающие с возрастом поста.
+
+    Посты старше settings.HOT_MAX_AGE_HOURS часов получают ноль.
+    """
+    age = ((now or timezone.now()) - created).total_seconds() / 3600
+    if age > settings.HOT_MAX_AGE_HOURS:
+        return 0.0
+    return (rating_count + 1) / (max(age, 0) + 2) ** settings.HOT_GRAVITY
+
+
+def set_hot_score(post_id, rating_count, created):
+    """Пересчитываем популярность поста после изменения его оценок."""
+    Post.objects.filter(pk=post_id).update(
+        hot_score=get_hot_score(rating_count, created),
+    )
+
+
+def decay_hot_scores(chunk_size=1000, now=None):
+    """Пересчитываем популярность свежих постов и обнуляем устаревшие.
+
+    Возвращаем количество пересчитанных постов.
+    """
+    now = now or timezone.now()
+    since = now - timedelta(hours=settings.HOT_MAX_AGE_HOURS)
+    Post.objects.filter(created__lt=since, hot_score__gt=0).update(
+        hot_score=0,
+    )
+    recent = Post.objects.filter(created__gte=since).values_list(
+        'pk', 'rating_count', 'created',
+    )
+    total = 0
+    batch = []
+    for post_id, rating_count, created in recent.iterator(chunk_size):
+        batch.append(Post(
+            pk=post_id, hot_score=get_hot_score(rating_count, created, now),
+        ))
+        if len(batch) == chunk_size:
+            Post.objects.bulk_update(batch, ['hot_score'])
+            total += len(batch)
+            batch = []
+    if batch:
+        Post.objects.bulk_update(batch, ['hot_score'])
+        total += len(batch)
+    return total
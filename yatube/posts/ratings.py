@@ -0,0 +1,45 @@
+from django.db import IntegrityError, transaction
+
+from .leaderboards import change_leaderboards
+from .models import Post, PostRating
+from .ranking import set_hot_score
+
+
+def set_rating(user, post_id, is_rating):
+    """Ставим или снимаем оценку поста без чтения самого поста.
+
+    Повторный запрос с тем же состоянием ничего не меняет, а гонка двух
+    одинаковых запросов не падает на unique_post_rating. Счетчик оценок
+    поста меняют сигналы PostRating. Возвращаем новое количество оценок
+    или None, если поста нет или он принадлежит пользователю.
+    """
+    changed = False
+    with transaction.atomic():
+        if is_rating:
+            if not Post.objects.filter(pk=post_id).exclude(
+                author=user,
+            ).exists():
+                return None
+            try:
+                with transaction.atomic():
+                    PostRating.objects.create(post_id=post_id, user=user)
+            except IntegrityError:
+                pass
+            else:
+                change_leaderboards(post_id, 1)
+                changed = True
+        else:
+            ratings = PostRating.objects.filter(post_id=post_id, user=user)
+            rated_at = ratings.values_list('created', flat=True).first()
+            deleted, _ = ratings.delete()
+            if deleted:
+                change_leaderboards(post_id, -deleted, rated_at)
+                changed = True
+        row = Post.objects.filter(pk=post_id).exclude(
+            author=user,
+        ).values_list('rating_count', 'created').first()
+        if row is None:
+            return None
+        if changed:
+            set_hot_score(post_id, *row)
+        return row[0]
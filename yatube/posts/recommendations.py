@@ -0,0 +1,161 @@
+from array import array
+
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+from scipy import sparse
+
+from .models import Follow, PostRating, Recommendation
+
+
+def _read_edges(queryset, chunk_size, users, authors):
+    """Дописываем пары (пользователь, автор) в компактные массивы,
+    читая строки частями, чтобы не держать в памяти объекты моделей."""
+    for user_id, author_id in queryset.iterator(chunk_size):
+        users.append(user_id)
+        authors.append(author_id)
+
+
+def build_matrix(chunk_size=10000, with_ratings=False):
+    """Разреженная матрица пользователь × автор из подписок и, по желанию,
+    оценок постов.
+
+    Возвращаем матрицу, матрицу одних подписок и массивы id строк
+    и столбцов.
+    """
+    users, authors = array('q'), array('q')
+    _read_edges(
+        Follow.objects.order_by().values_list('user_id', 'author_id'),
+        chunk_size, users, authors,
+    )
+    follows = len(users)
+    if with_ratings:
+        _read_edges(
+            PostRating.objects.order_by().values_list(
+                'user_id', 'post__author_id',
+            ),
+            chunk_size, users, authors,
+        )
+    users = np.frombuffer(users, dtype=np.int64)
+    authors = np.frombuffer(authors, dtype=np.int64)
+    user_ids, rows = np.unique(users, return_inverse=True)
+    author_ids, columns = np.unique(authors, return_inverse=True)
+    shape = (len(user_ids), len(author_ids))
+    weights = np.full(len(users), settings.RECOMMENDATION_RATING_WEIGHT)
+    weights[:follows] = 1
+    matrix = sparse.csr_matrix((weights, (rows, columns)), shape=shape)
+    matrix.data = np.log1p(matrix.data)
+    followed = sparse.csr_matrix(
+        (np.ones(follows), (rows[:follows], columns[:follows])), shape=shape,
+    )
+    return matrix, followed, user_ids, author_ids
+
+
+def get_similarity(matrix, neighbours, block_size=None):
+    """Косинусное сходство авторов по общим читателям.
+
+    Сходство считается блоками по block_size авторов, и в каждом блоке
+    у автора сразу остаются neighbours самых похожих. Полное
+    произведение автор × автор не строится, и размер матрицы сходства
+    растет линейно от числа авторов.
+    """
+    if block_size is None:
+        block_size = settings.RECOMMENDATION_SIMILARITY_BLOCK
+    norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=0))).ravel()
+    norms[norms == 0] = 1
+    normalized = (matrix @ sparse.diags(1 / norms)).tocsr()
+    transposed = normalized.T.tocsr()
+    blocks = []
+    for start in range(0, transposed.shape[0], block_size):
+        block = (transposed[start:start + block_size] @ normalized).tocsr()
+        block.setdiag(0, k=start)
+        block.eliminate_zeros()
+        for row in range(block.shape[0]):
+            begin, end = block.indptr[row], block.indptr[row + 1]
+            if end - begin > neighbours:
+                values = block.data[begin:end]
+                weakest = np.argpartition(values, -neighbours)[:-neighbours]
+                values[weakest] = 0
+        block.eliminate_zeros()
+        blocks.append(block)
+    return sparse.vstack(blocks, format='csr')
+
+
+def _top_k(scores, k):
+    """Индексы k лучших значений строки по убыванию."""
+    if len(scores) > k:
+        best = np.argpartition(scores, -k)[-k:]
+    else:
+        best = np.arange(len(scores))
+    return best[np.argsort(-scores[best], kind='stable')]
+
+
+def compute_recommendations(chunk_size=10000, with_ratings=False):
+    """Лучшие settings.RECOMMENDATIONS_PER_USER авторов для каждого
+    пользователя: сумма сходства кандидата с авторами, которых
+    пользователь читает. Пользователи обрабатываются частями по
+    chunk_size строк. Выдаем тройки (user_id, author_id, score)."""
+    matrix, followed, user_ids, author_ids = build_matrix(
+        chunk_size, with_ratings,
+    )
+    if not matrix.nnz:
+        return
+    similarity = get_similarity(
+        matrix, settings.RECOMMENDATION_NEIGHBOURS,
+    )
+    author_index = {author_id: i for i, author_id in enumerate(author_ids)}
+    k = settings.RECOMMENDATIONS_PER_USER
+    for start in range(0, len(user_ids), chunk_size):
+        chunk = slice(start, start + chunk_size)
+        scores = (matrix[chunk] @ similarity).tocsr()
+        scores = scores - scores.multiply(followed[chunk] > 0)
+        own = [
+            (row, author_index[user_id])
+            for row, user_id in enumerate(user_ids[chunk])
+            if user_id in author_index
+        ]
+        if own:
+            own_rows, own_columns = zip(*own)
+            own = sparse.csr_matrix(
+                (np.ones(len(own_rows)), (own_rows, own_columns)),
+                shape=scores.shape,
+            )
+            scores = scores - scores.multiply(own)
+        scores.eliminate_zeros()
+        for row in range(scores.shape[0]):
+            begin, end = scores.indptr[row], scores.indptr[row + 1]
+            values = scores.data[begin:end]
+            columns = scores.indices[begin:end]
+            for best in _top_k(values, k):
+                yield (
+                    int(user_ids[start + row]),
+                    int(author_ids[columns[best]]),
+                    float(values[best]),
+                )
+
+
+def save_recommendations(rows, batch_size=1000):
+    """Заменяем все рекомендации новыми.
+
+    Сначала досчитываем все строки в компактные массивы и только потом
+    меняем таблицу короткой транзакцией: пока идет расчет, SQLite
+    не держит блокировку записи и сайт пишет в БД как обычно.
+    """
+    users, authors, scores = array('q'), array('q'), array('d')
+    for user_id, author_id, score in rows:
+        users.append(user_id)
+        authors.append(author_id)
+        scores.append(score)
+    with transaction.atomic():
+        Recommendation.objects.all().delete()
+        for start in range(0, len(users), batch_size):
+            batch = slice(start, start + batch_size)
+            Recommendation.objects.bulk_create([
+                Recommendation(
+                    user_id=user_id, author_id=author_id, score=score,
+                )
+                for user_id, author_id, score in zip(
+                    users[batch], authors[batch], scores[batch],
+                )
+            ])
+    return len(users)
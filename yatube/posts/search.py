@@ -0,0 +1,274 @@
+from django.conf import settings
+from django.core.paginator import Paginator
+from django.db import connection
+from django.http import Http404
+from django.utils.html import escape
+from django.utils.safestring import mark_safe
+
+from .models import Comment, Post
+from .utils import get_page_window
+
+POST_INDEX = 'posts_post_fts'
+COMMENT_INDEX = 'posts_comment_fts'
+TOKENIZE = 'unicode61 remove_diacritics 2'
+# Служебные символы вокруг найденных слов: текст экранируется целиком,
+# а затем они заменяются на <mark>.
+HIGHLIGHT_START = '\x02'
+HIGHLIGHT_END = '\x03'
+POST = 'post'
+COMMENT = 'comment'
+INDEXES = ((POST, POST_INDEX), (COMMENT, COMMENT_INDEX))
+# Триггеры миграции 0033_search_index: <индекс>_<событие>.
+TRIGGER_EVENTS = ('insert', 'delete', 'update')
+
+
+def get_match_expression(query):
+    """Запрос пользователя как выражение FTS5.
+
+    Каждое слово берется в кавычки, чтобы операторы и спецсимволы
+    не ломали синтаксис MATCH. Стемминга для русского в FTS5 нет,
+    поэтому слово со звездочкой в конце ищется по префиксу: «туман*»
+    находит «тумане». Префикс короче SEARCH_PREFIX_LENGTH ищется как
+    слово: такой запрос собирает огромный список совпадений.
+    """
+    terms = []
+    for term in query.split()[:settings.SEARCH_MAX_TERMS]:
+        prefix = term.rstrip('*')
+        if not prefix:
+            continue
+        star = (
+            '*' if prefix != term
+            and len(prefix) >= settings.SEARCH_PREFIX_LENGTH else ''
+        )
+        terms.append('"{}"{}'.format(prefix.replace('"', '""'), star))
+    return ' '.join(terms)
+
+
+def get_ranked_sql(kind, index):
+    """Запрос результатов из индекса, упорядочиваемых по BM25.
+
+    BM25 считается только для SEARCH_RANK_WINDOW самых новых совпадений:
+    для слова, которое есть почти в каждом тексте, ранжирование всех
+    совпадений занимает секунды. id растут со временем, поэтому окно
+    задается нижней границей rowid. Параметры: начало и конец выделения,
+    длина фрагмента, выражение MATCH, оно же и размер окна без единицы.
+    """
+    return (
+        f"SELECT '{kind}' AS kind, rowid AS object_id, "
+        f"snippet({index}, 0, %s, %s, '…', %s) AS snippet, "
+        f"bm25({index}) AS rank "
+        f"FROM {index} WHERE {index} MATCH %s AND rowid >= COALESCE(("
+        f"SELECT rowid FROM {index} WHERE {index} MATCH %s "
+        f"ORDER BY rowid DESC LIMIT 1 OFFSET %s), 0)"
+    )
+
+
+def get_ranked_params(expression):
+    return [
+        HIGHLIGHT_START, HIGHLIGHT_END, settings.SEARCH_SNIPPET_TOKENS,
+        expression, expression, settings.SEARCH_RANK_WINDOW - 1,
+    ]
+
+
+def _count_sql(index):
+    return (
+        f'SELECT COUNT(*) FROM (SELECT rowid FROM {index} '
+        f'WHERE {index} MATCH %s ORDER BY rowid DESC LIMIT %s)'
+    )
+
+
+def highlight(snippet):
+    """Экранируем фрагмент текста и выделяем в нем найденные слова."""
+    return mark_safe(
+        escape(snippet)
+        .replace(HIGHLIGHT_START, '<mark>')
+        .replace(HIGHLIGHT_END, '</mark>')
+    )
+
+
+class SearchResults:
+    """Выдача поиска по постам и комментариям для Paginator.
+
+    Количество и страницы выбираются отдельными запросами к индексам
+    FTS5 по мере обращения. BM25 двух индексов считается по разной
+    статистике и несравним, поэтому каждый индекс упорядочен по своему
+    rank (чем меньше, тем выше результат), а выдача чередует пост
+    и комментарий, пока не закончится один из списков. В выдаче
+    не больше SEARCH_RANK_WINDOW самых новых постов и стольких же
+    комментариев.
+    """
+
+    def __init__(self, expression):
+        self.expression = expression
+        self._counts = None
+
+    def get_counts(self):
+        """Количество найденных постов и комментариев."""
+        if self._counts is None:
+            self._counts = {POST: 0, COMMENT: 0}
+            if self.expression:
+                with connection.cursor() as cursor:
+                    cursor.execute(
+                        f'SELECT ({_count_sql(POST_INDEX)}), '
+                        f'({_count_sql(COMMENT_INDEX)})',
+                        [self.expression, settings.SEARCH_RANK_WINDOW] * 2,
+                    )
+                    self._counts[POST], self._counts[COMMENT] = (
+                        cursor.fetchone()
+                    )
+        return self._counts
+
+    def count(self):
+        return sum(self.get_counts().values())
+
+    def _taken(self, position):
+        """Сколько постов и комментариев стоит перед позицией выдачи."""
+        counts = self.get_counts()
+        paired = min(counts.values())
+        if position <= 2 * paired:
+            return {POST: (position + 1) // 2, COMMENT: position // 2}
+        rest = position - 2 * paired
+        return {
+            kind: paired + (rest if counts[kind] > paired else 0)
+            for kind in (POST, COMMENT)
+        }
+
+    def _fetch(self, kind, index, offset, limit):
+        if not limit:
+            return []
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'{get_ranked_sql(kind, index)} '
+                f'ORDER BY rank LIMIT %s OFFSET %s',
+                get_ranked_params(self.expression) + [limit, offset],
+            )
+            return cursor.fetchall()
+
+    def __getitem__(self, index):
+        if not self.expression:
+            return []
+        start = index.start or 0
+        stop = min(index.stop, self.count())
+        if start >= stop:
+            return []
+        first, last = self._taken(start), self._taken(stop)
+        rows = {
+            kind: iter(self._fetch(
+                kind, search_index, first[kind], last[kind] - first[kind],
+            ))
+            for kind, search_index in INDEXES
+        }
+        merged = []
+        for position in range(start, stop):
+            before, after = self._taken(position), self._taken(position + 1)
+            kind = POST if after[POST] > before[POST] else COMMENT
+            # Строк может оказаться меньше, если индекс изменился
+            # между подсчетом и выборкой.
+            row = next(rows[kind], None)
+            if row is not None:
+                merged.append(row)
+        return attach_objects(merged)
+
+
+def attach_objects(rows):
+    """Результаты поиска с постами и комментариями из БД:
+    по одному запросу на модель."""
+    ids = {POST: [], COMMENT: []}
+    for kind, object_id, _, _ in rows:
+        ids[kind].append(object_id)
+    objects = {
+        POST: Post.objects.select_related('author', 'group').in_bulk(
+            ids[POST],
+        ),
+        COMMENT: Comment.objects.select_related('author', 'post').in_bulk(
+            ids[COMMENT],
+        ),
+    }
+    results = []
+    for kind, object_id, snippet, rank in rows:
+        obj = objects[kind].get(object_id)
+        if obj is not None:
+            results.append({
+                'kind': kind,
+                'object': obj,
+                'snippet': highlight(snippet),
+                'rank': rank,
+            })
+    return results
+
+
+def get_search_page(query, page_number):
+    """Страница выдачи поиска по номеру, не глубже PAGINATOR_MAX_PAGE."""
+    try:
+        number = int(page_number) if page_number else 1
+    except ValueError:
+        number = 1
+    if number > settings.PAGINATOR_MAX_PAGE:
+        raise Http404('Слишком глубокая страница, уточните запрос.')
+    paginator = Paginator(
+        SearchResults(get_match_expression(query)),
+        settings.POSTS_PER_PAGE,
+    )
+    page_obj = paginator.get_page(number)
+    page_obj.max_page = settings.PAGINATOR_MAX_PAGE
+    page_obj.last_page = min(paginator.num_pages, page_obj.max_page)
+    page_obj.page_window = get_page_window(
+        page_obj.number,
+        page_obj.last_page,
+        settings.PAGINATOR_ON_EACH_SIDE,
+    )
+    return page_obj
+
+
+def filter_posts(queryset, query):
+    """Посты из queryset, найденные полнотекстовым поиском.
+
+    Подзапрос добавляется через extra(): pk__in=RawSQL(...) берется
+    в двойные скобки, и SQLite сравнивает id только с первой строкой.
+    Запрос без слов для поиска ничего не находит: MATCH с пустым
+    выражением падает с синтаксической ошибкой.
+    """
+    expression = get_match_expression(query)
+    if not expression:
+        return queryset.none()
+    return queryset.extra(
+        where=[
+            f'{Post._meta.db_table}.id IN (SELECT rowid FROM {POST_INDEX} '
+            f'WHERE {POST_INDEX} MATCH %s)'
+        ],
+        params=[expression],
+    )
+
+
+def rebuild_index():
+    """Перестраиваем индексы из таблиц моделей и сжимаем их."""
+    with connection.cursor() as cursor:
+        for index in (POST_INDEX, COMMENT_INDEX):
+            cursor.execute(
+                f"INSERT INTO {index}({index}) VALUES ('rebuild')"
+            )
+            cursor.execute(
+                f"INSERT INTO {index}({index}) VALUES ('optimize')"
+            )
+
+
+def get_missing_triggers():
+    """Триггеры синхронизации индексов, которых нет в БД.
+
+    Django пересоздает таблицу SQLite при многих изменениях поля
+    и теряет триггеры. Если индексов еще нет, миграция не применена
+    и проверять нечего.
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT type, name FROM sqlite_master "
+            "WHERE type IN ('table', 'trigger')"
+        )
+        existing = set(cursor.fetchall())
+    return [
+        f'{index}_{event}'
+        for _, index in INDEXES
+        if ('table', index) in existing
+        for event in TRIGGER_EVENTS
+        if ('trigger', f'{index}_{event}') not in existing
+    ]
@@ -0,0 +1,235 @@
+from django.db import transaction
+from django.db.models.signals import (post_delete, post_save, pre_delete,
+                                      pre_save)
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .comments import get_path_segment, get_reply_parent
+from .counters import (change_comments_count, change_follow_counters,
+                       change_group_posts_count, change_posts_count,
+                       change_rating_count, change_replies_count)
+from .feed import fan_out_post
+from .fragments import bump_versions
+from .media import change_refs, replace_file
+from .models import Comment, Follow, Group, Post, PostRating
+from .ranking import get_hot_score
+
+
+@receiver(pre_save, sender=Post)
+def remember_post_group(sender, instance, **kwargs):
+    """Запоминаем прежние группу поста, чтобы сбросить и ее страницу,
+    и картинку, чтобы снять с нее ссылку."""
+    instance._old_group_id = None
+    instance._old_image = ''
+    if instance.pk:
+        instance._old_group_id, instance._old_image = Post.objects.filter(
+            pk=instance.pk,
+        ).values_list('group_id', 'image').first() or (None, '')
+
+
+@receiver(pre_save, sender=Post)
+def score_new_post(sender, instance, **kwargs):
+    """Новый пост сразу попадает в популярные со стартовым весом."""
+    if instance._state.adding and not instance.hot_score:
+        instance.hot_score = get_hot_score(
+            instance.rating_count, instance.created or timezone.now(),
+        )
+
+
+@receiver(post_save, sender=Post)
+def count_saved_post(sender, instance, created, **kwargs):
+    """Учитываем новый пост и перенос поста в другую группу."""
+    if created:
+        change_posts_count(instance, 1)
+    elif instance._old_group_id != instance.group_id:
+        change_group_posts_count(instance._old_group_id, -1)
+        change_group_posts_count(instance.group_id, 1)
+
+
+@receiver(post_save, sender=Post)
+def fan_out_saved_post(sender, instance, created, **kwargs):
+    """Раскладываем новый пост по лентам подписчиков после фиксации:
+    откаченный пост не должен попасть в ленты."""
+    if created:
+        transaction.on_commit(lambda: fan_out_post(instance))
+
+
+@receiver(post_delete, sender=Post)
+def count_deleted_post(sender, instance, **kwargs):
+    """Учитываем удаленный пост."""
+    change_posts_count(instance, -1)
+
+
+@receiver(post_save, sender=Post)
+def count_image_refs(sender, instance, created, **kwargs):
+    """Учитываем ссылку поста на файл картинки."""
+    if created:
+        change_refs(instance.image.name, 1)
+    else:
+        replace_file(instance._old_image, instance.image.name)
+
+
+@receiver(post_delete, sender=Post)
+def release_deleted_image(sender, instance, **kwargs):
+    """Снимаем ссылку удаленного поста на файл картинки."""
+    change_refs(instance.image.name, -1)
+
+
+@receiver(pre_save, sender=Comment)
+def place_comment(sender, instance, **kwargs):
+    """Ставим новый ответ в ветку родителя."""
+    if not instance._state.adding:
+        return
+    instance.parent = get_reply_parent(instance.parent)
+    if instance.parent is not None:
+        instance.depth = instance.parent.depth + 1
+        instance.root_id = (
+            instance.parent.root_id or instance.parent.pk
+        )
+
+
+@receiver(post_save, sender=Comment)
+def count_saved_comment(sender, instance, created, **kwargs):
+    """Записываем путь нового комментария и учитываем его у поста
+    и ответ в ветке."""
+    if not created:
+        return
+    change_comments_count(instance.post_id, 1)
+    segment = get_path_segment(instance.pk)
+    if instance.parent is not None:
+        instance.path = f'{instance.parent.path}/{segment}'
+        change_replies_count(instance.root_id, 1)
+    else:
+        instance.path = segment
+        instance.root_id = instance.pk
+    Comment.objects.filter(pk=instance.pk).update(
+        path=instance.path, root_id=instance.root_id,
+    )
+
+
+@receiver(post_delete, sender=Comment)
+def count_deleted_comment(sender, instance, **kwargs):
+    """Учитываем удаленный комментарий у поста и ответ в ветке.
+
+    Ответы удаляются каскадом вместе с родителем, и сигнал приходит
+    для каждого из них.
+    """
+    change_comments_count(instance.post_id, -1)
+    if instance.depth:
+        change_replies_count(instance.root_id, -1)
+
+
+@receiver(pre_save, sender=Follow)
+def remember_follow(sender, instance, **kwargs):
+    """Запоминаем прежних подписчика и автора, если подписку правят
+    в админке."""
+    instance._old_follow = None
+    if instance.pk:
+        instance._old_follow = Follow.objects.filter(
+            pk=instance.pk,
+        ).values_list('user_id', 'author_id').first()
+
+
+@receiver(post_save, sender=Follow)
+def count_saved_follow(sender, instance, created, **kwargs):
+    """Учитываем новую подписку у подписчика и автора."""
+    follow = (instance.user_id, instance.author_id)
+    if created:
+        change_follow_counters(*follow, 1)
+    elif instance._old_follow and instance._old_follow != follow:
+        change_follow_counters(*instance._old_follow, -1)
+        change_follow_counters(*follow, 1)
+
+
+@receiver(post_delete, sender=Follow)
+def count_deleted_follow(sender, instance, **kwargs):
+    """Учитываем отписку, в том числе каскадную вместе
+    с пользователем."""
+    change_follow_counters(instance.user_id, instance.author_id, -1)
+
+
+@receiver(pre_save, sender=PostRating)
+def remember_rated_post(sender, instance, **kwargs):
+    """Запоминаем прежний пост оценки, если ее правят в админке."""
+    instance._old_post_id = None
+    if instance.pk:
+        instance._old_post_id = PostRating.objects.filter(
+            pk=instance.pk,
+        ).values_list('post_id', flat=True).first()
+
+
+@receiver(post_save, sender=PostRating)
+def count_saved_rating(sender, instance, created, **kwargs):
+    """Учитываем новую оценку поста и перенос оценки на другой пост."""
+    if created:
+        change_rating_count(instance.post_id, 1)
+    elif instance._old_post_id not in (None, instance.post_id):
+        change_rating_count(instance._old_post_id, -1)
+        change_rating_count(instance.post_id, 1)
+
+
+@receiver(post_delete, sender=PostRating)
+def count_deleted_rating(sender, instance, **kwargs):
+    """Учитываем снятую оценку, в том числе каскадную."""
+    change_rating_count(instance.post_id, -1)
+
+
+def _bump_on_commit(*scopes):
+    """Сбрасываем версии после фиксации транзакции.
+
+    Иначе параллельный запрос успеет закэшировать еще старые данные
+    под новой версией, а откат транзакции все равно сбросит кэш.
+    """
+    transaction.on_commit(lambda: bump_versions(*scopes))
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def invalidate_post(sender, instance, **kwargs):
+    """Пост виден на главной, в группе, в профиле и на своей странице."""
+    group_ids = {instance.group_id, getattr(instance, '_old_group_id', None)}
+    _bump_on_commit(
+        'index',
+        f'post:{instance.pk}',
+        f'profile:{instance.author_id}',
+        *(f'group:{group_id}' for group_id in group_ids if group_id),
+    )
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+@receiver(post_save, sender=PostRating)
+@receiver(post_delete, sender=PostRating)
+def invalidate_post_detail(sender, instance, **kwargs):
+    """Комментарии и оценки видны только на странице поста."""
+    _bump_on_commit(f'post_detail:{instance.post_id}')
+
+
+@receiver(post_save, sender=Follow)
+@receiver(post_delete, sender=Follow)
+def invalidate_follow(sender, instance, **kwargs):
+    """Подписка меняет ленту подписчика и счетчики обоих профилей."""
+    _bump_on_commit(
+        f'follow:{instance.user_id}',
+        f'profile:{instance.user_id}',
+        f'profile:{instance.author_id}',
+    )
+
+
+@receiver(post_save, sender=Group)
+@receiver(pre_delete, sender=Group)
+def invalidate_group(sender, instance, **kwargs):
+    """Группа видна на своей странице и в карточках своих постов.
+
+    Карточки лежат внутри закэшированных лент главной и профилей
+    авторов группы, поэтому сбрасываются и они. Удаление обрабатываем
+    до того, как посты отвяжутся от группы.
+    """
+    author_ids = Post.objects.filter(group_id=instance.pk).order_by(
+        'author_id',
+    ).values_list('author_id', flat=True).distinct()
+    _bump_on_commit(
+        'index',
+        f'group:{instance.pk}',
+        *(f'profile:{author_id}' for author_id in author_ids),
+    )
@@ -0,0 +1,11 @@
+from django import template
+
+from ..fragments import render_post_cards
+
+register = template.Library()
+
+
+@register.simple_tag
+def post_cards(page_obj, **flags):
+    """Закэшированные карточки постов страницы."""
+    return render_post_cards(page_obj, **flags)
@@ -0,0 +1,63 @@
+from django import template
+from django.conf import settings
+from django.core.files.storage import default_storage
+
+from ..models import PostImageVariant
+from ..thumbnail_cache import backend
+from ..thumbnails import schedule_thumbnails
+
+register = template.Library()
+
+
+@register.simple_tag
+def ready_thumbnail(image, geometry, **options):
+    """Готовая миниатюра картинки поста или None.
+
+    Шаблон не ждет обработки картинки: если миниатюры еще нет, ставим
+    ее в очередь и выводим запасной вариант.
+    """
+    if not image:
+        return None
+    thumbnail = backend.get_ready_thumbnail(image, geometry, **options)
+    if thumbnail is None:
+        schedule_thumbnails(image.instance)
+    return thumbnail
+
+
+@register.simple_tag
+def image_sources(post):
+    """Атрибуты srcset и sizes картинки поста из описаний ее копий.
+
+    Возвращаем None, пока копии не готовы. Файлы не читаются: адреса
+    строит хранилище по сохраненным именам.
+    """
+    if not post.image:
+        return None
+    variants = {}
+    for variant in post.image_variants.all():
+        variants.setdefault(variant.format, []).append(variant)
+    jpeg = variants.get(PostImageVariant.JPEG)
+    if not jpeg:
+        return None
+    fallback = min(
+        jpeg,
+        key=lambda variant: abs(
+            variant.width - settings.IMAGE_VARIANT_DEFAULT_WIDTH
+        ),
+    )
+    srcset = {
+        image_format: ', '.join(
+            f'{default_storage.url(variant.name)} {variant.width}w'
+            for variant in format_variants
+        )
+        for image_format, format_variants in variants.items()
+    }
+    return {
+        'webp_srcset': srcset.get(PostImageVariant.WEBP),
+        'jpeg_srcset': srcset[PostImageVariant.JPEG],
+        'src': default_storage.url(fallback.name),
+        'width': fallback.width,
+        'height': fallback.height,
+        'sizes': settings.IMAGE_VARIANT_SIZES,
+        'placeholder': post.image_placeholder,
+    }
@@ -0,0 +1,111 @@
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from ..comments import get_subtree
+from ..counters import get_profile
+from ..models import COMMENT_MAX_DEPTH, Comment, Post, User
+
+
+class CommentThreadsTests(TestCase):
+    """Тестируем ветки ответов на комментарии."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.user = User.objects.create_user(username='user')
+        cls.post = Post.objects.create(author=cls.author, text='Пост')
+
+    def setUp(self):
+        cache.clear()
+        get_profile(self.author)
+        self.client = Client()
+        self.client.force_login(self.user)
+
+    def reply(self, parent=None, text='Ответ'):
+        return Comment.objects.create(
+            post=self.post, author=self.user, text=text, parent=parent,
+        )
+
+    def test_replies_are_stored_in_thread_order(self):
+        """Проверяем, что поддерево выбирается одним запросом по порядку."""
+        root = self.reply(text='Корень')
+        first = self.reply(root, 'Первый')
+        other_root = self.reply(text='Другой корень')
+        second = self.reply(root, 'Второй')
+        nested = self.reply(first, 'Вложенный')
+        self.reply(other_root, 'Чужой ответ')
+        root.refresh_from_db()
+        with self.assertNumQueries(1):
+            subtree = get_subtree(root)
+        self.assertEqual(subtree, [root, first, nested, second])
+        self.assertEqual([node.level for node in subtree], [0, 1, 2, 1])
+        self.assertEqual(root.replies_count, 3)
+        self.assertEqual(nested.root_id, root.pk)
+
+    def test_deep_reply_becomes_sibling(self):
+        """Проверяем, что ответ не опускается глубже COMMENT_MAX_DEPTH."""
+        parent = None
+        for _ in range(COMMENT_MAX_DEPTH + 2):
+            parent = self.reply(parent)
+        self.assertEqual(parent.depth, COMMENT_MAX_DEPTH)
+
+    @override_settings(COMMENTS_RENDER_DEPTH=1)
+    def test_post_detail_renders_threads_without_recursion(self):
+        """Проверяем, что ответы на странице поста берутся одним
+        запросом и не глубже COMMENTS_RENDER_DEPTH."""
+        for i in range(3):
+            root = self.reply(text=f'Корень {i}')
+            child = self.reply(root, f'Ответ {i}')
+            self.reply(child, f'Глубокий ответ {i}')
+        url = reverse('posts:post_detail', args=(self.post.pk,))
+        with self.assertNumQueries(5):
+            response = Client().get(url)
+        self.assertContains(response, 'Ответ 2')
+        self.assertNotContains(response, 'Глубокий ответ')
+
+    @override_settings(COMMENTS_THREAD_PREVIEW=1)
+    def test_large_thread_is_linked(self):
+        """Проверяем, что большая ветка открывается отдельной страницей."""
+        root = self.reply(text='Корень')
+        self.reply(root, 'Первый')
+        self.reply(root, 'Второй')
+        thread_url = reverse(
+            'posts:comment_thread', args=(self.post.pk, root.pk),
+        )
+        response = Client().get(
+            reverse('posts:post_detail', args=(self.post.pk,)),
+        )
+        self.assertNotContains(response, 'Первый')
+        self.assertContains(response, thread_url)
+        response = Client().get(thread_url)
+        self.assertContains(response, 'Второй')
+
+    def test_add_reply(self):
+        """Проверяем ответ через форму и счетчик ветки."""
+        root = self.reply(text='Корень')
+        response = self.client.post(
+            reverse('posts:add_comment', args=(self.post.pk,)),
+            data={'text': 'Ответ из формы', 'parent': root.pk},
+        )
+        self.assertRedirects(
+            response,
+            reverse('posts:comment_thread', args=(self.post.pk, root.pk)),
+        )
+        root.refresh_from_db()
+        self.assertEqual(root.replies_count, 1)
+        reply = Comment.objects.get(text='Ответ из формы')
+        self.assertEqual(reply.path, f'{root.path}/{reply.pk:010d}')
+
+    def test_reply_to_other_post_is_rejected(self):
+        """Проверяем, что нельзя ответить на комментарий другого поста."""
+        other = Post.objects.create(author=self.author, text='Другой пост')
+        foreign = Comment.objects.create(
+            post=other, author=self.user, text='Чужой',
+        )
+        self.client.post(
+            reverse('posts:add_comment', args=(self.post.pk,)),
+            data={'text': 'Ответ', 'parent': foreign.pk},
+        )
+        self.assertFalse(Comment.objects.filter(text='Ответ').exists())
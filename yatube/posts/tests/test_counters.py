@@ -0,0 +1,227 @@
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from ..counters import POSTS_TOTAL, get_posts_total, get_profile
+from ..fragments import get_versions
+from ..models import (Comment, Counter, Follow, Group, Post, PostRating,
+                      Profile, User)
+
+
+class CountersTests(TestCase):
+    """Тестируем хранимые счетчики постов, групп и профилей."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.user = User.objects.create_user(username='user')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+
+    def setUp(self):
+        self.author_client = Client()
+        self.author_client.force_login(self.author)
+        self.user_client = Client()
+        self.user_client.force_login(self.user)
+
+    def test_views_keep_counters_up_to_date(self):
+        """Проверяем, что представления обновляют счетчики."""
+        self.author_client.post(
+            reverse('posts:post_create'),
+            data={'text': 'Пост', 'group': self.group.pk},
+        )
+        post = Post.objects.get(text='Пост')
+        self.user_client.post(
+            reverse('posts:add_comment', args=(post.pk,)),
+            data={'text': 'Комментарий'},
+        )
+        self.user_client.get(reverse('posts:rating_up', args=(post.pk,)))
+        self.user_client.get(reverse('posts:rating_up', args=(post.pk,)))
+        self.user_client.get(
+            reverse('posts:profile_follow', args=(self.author.username,))
+        )
+        post.refresh_from_db()
+        self.group.refresh_from_db()
+        counters = {
+            post.rating_count: 1,
+            post.comments_count: 1,
+            self.group.posts_count: 1,
+            get_profile(self.author).posts_count: 1,
+            get_profile(self.author).followers_count: 1,
+            get_profile(self.user).following_count: 1,
+        }
+        for value, expected in counters.items():
+            with self.subTest(expected=expected):
+                self.assertEqual(value, expected)
+        self.user_client.get(reverse('posts:rating_down', args=(post.pk,)))
+        self.user_client.get(
+            reverse('posts:profile_unfollow', args=(self.author.username,))
+        )
+        post.refresh_from_db()
+        self.assertEqual(post.rating_count, 0)
+        self.assertEqual(get_profile(self.author).followers_count, 0)
+        self.assertEqual(get_profile(self.user).following_count, 0)
+
+    def test_recount_counters_repairs_drift(self):
+        """Проверяем, что команда пересчета чинит рассинхрон счетчиков."""
+        post = Post.objects.create(
+            author=self.author, text='Пост', group=self.group,
+        )
+        Post.objects.filter(pk=post.pk).update(comments_count=10)
+        Profile.objects.filter(user=self.author).delete()
+        Counter.objects.filter(name=POSTS_TOTAL).update(value=0)
+        call_command('recount_counters', chunk_size=1, stdout=StringIO())
+        post.refresh_from_db()
+        self.group.refresh_from_db()
+        self.assertEqual(get_posts_total(), Post.objects.count())
+        self.assertEqual(post.comments_count, 0)
+        self.assertEqual(self.group.posts_count, 1)
+        self.assertEqual(
+            Profile.objects.get(user=self.author).posts_count, 1
+        )
+
+    def test_comment_delete_updates_counters(self):
+        """Проверяем, что удаление комментария с ответами уменьшает
+        счетчик поста, а пересчет чинит счетчики ответов в ветках."""
+        post = Post.objects.create(author=self.author, text='Пост')
+        root = Comment.objects.create(
+            post=post, author=self.user, text='Комментарий',
+        )
+        reply = Comment.objects.create(
+            post=post, author=self.author, text='Ответ', parent=root,
+        )
+        Comment.objects.create(
+            post=post, author=self.user, text='Ответ на ответ', parent=reply,
+        )
+        post.refresh_from_db()
+        self.assertEqual(post.comments_count, 3)
+        reply.delete()
+        post.refresh_from_db()
+        root.refresh_from_db()
+        self.assertEqual(post.comments_count, 1)
+        self.assertEqual(root.replies_count, 0)
+        Comment.objects.create(
+            post=post, author=self.author, text='Новый ответ', parent=root,
+        )
+        Comment.objects.filter(pk=root.pk).update(replies_count=5)
+        call_command('recount_counters', stdout=StringIO())
+        root.refresh_from_db()
+        self.assertEqual(root.replies_count, 1)
+
+    def test_posts_totals_follow_create_and_delete(self):
+        """Проверяем, что общий счетчик постов и счетчики группы и автора
+        меняются при создании и удалении поста."""
+        total = get_posts_total()
+        post = Post.objects.create(
+            author=self.author, text='Пост', group=self.group,
+        )
+        self.group.refresh_from_db()
+        self.assertEqual(get_posts_total(), total + 1)
+        self.assertEqual(self.group.posts_count, 1)
+        self.assertEqual(get_profile(self.author).posts_count, 1)
+        post.delete()
+        self.group.refresh_from_db()
+        self.assertEqual(get_posts_total(), total)
+        self.assertEqual(self.group.posts_count, 0)
+        self.assertEqual(get_profile(self.author).posts_count, 0)
+
+    def test_paginator_does_not_count_posts(self):
+        """Проверяем, что ленты не выполняют COUNT(*) по постам."""
+        Post.objects.create(author=self.author, text='Пост', group=self.group)
+        pages = (
+            reverse('posts:index'),
+            reverse('posts:group_list', args=(self.group.slug,)),
+            reverse('posts:profile', args=(self.author.username,)),
+        )
+        for page in pages:
+            with self.subTest(page=page):
+                with CaptureQueriesContext(connection) as queries:
+                    self.user_client.get(page)
+                self.assertFalse([
+                    query for query in queries.captured_queries
+                    if 'COUNT(*)' in query['sql']
+                    and 'posts_post' in query['sql']
+                ])
+
+    def test_profile_page_shows_stored_stats(self):
+        """Проверяем, что профиль берет статистику из счетчиков и не
+        передает в шаблон все посты автора."""
+        post = Post.objects.create(author=self.author, text='Пост')
+        self.user_client.get(
+            reverse('posts:profile_follow', args=(self.author.username,))
+        )
+        response = self.user_client.get(
+            reverse('posts:profile', args=(self.author.username,))
+        )
+        self.assertNotIn('posts', response.context)
+        author_profile = response.context['author_profile']
+        self.assertEqual(author_profile.posts_count, 1)
+        self.assertEqual(author_profile.followers_count, 1)
+        self.assertEqual(author_profile.last_post_at, post.created)
+        post.delete()
+        self.assertIsNone(get_profile(self.author).last_post_at)
+
+    def test_user_with_posts_can_be_deleted(self):
+        """Проверяем, что пользователя с постами можно удалить, а общий
+        счетчик и счетчик группы уменьшаются."""
+        total = get_posts_total()
+        author = User.objects.create_user(username='leaving')
+        Post.objects.create(author=author, text='Пост', group=self.group)
+        Post.objects.create(author=author, text='Еще пост')
+        author_id = author.pk
+        author.delete()
+        self.group.refresh_from_db()
+        self.assertEqual(get_posts_total(), total)
+        self.assertEqual(self.group.posts_count, 0)
+        self.assertFalse(Profile.objects.filter(user_id=author_id).exists())
+
+    def test_deleted_user_follows_and_ratings_are_uncounted(self):
+        """Проверяем, что подписки и оценки, удаленные каскадом вместе
+        с пользователем, уменьшают счетчики автора и поста."""
+        post = Post.objects.create(author=self.author, text='Пост')
+        leaving = User.objects.create_user(username='leaving')
+        Follow.objects.create(user=leaving, author=self.author)
+        PostRating.objects.create(user=leaving, post=post)
+        post.refresh_from_db()
+        self.assertEqual(get_profile(self.author).followers_count, 1)
+        self.assertEqual(post.rating_count, 1)
+        leaving.delete()
+        post.refresh_from_db()
+        self.assertEqual(get_profile(self.author).followers_count, 0)
+        self.assertEqual(post.rating_count, 0)
+
+    def test_edited_follow_moves_counters(self):
+        """Проверяем, что подписка, перенесенная на другого автора,
+        переносит и счетчик подписчиков."""
+        follow = Follow.objects.create(user=self.user, author=self.author)
+        other = User.objects.create_user(username='other')
+        follow.author = other
+        follow.save()
+        self.assertEqual(get_profile(self.author).followers_count, 0)
+        self.assertEqual(get_profile(other).followers_count, 1)
+        self.assertEqual(get_profile(self.user).following_count, 1)
+
+    def test_follow_count_survives_unrelated_posts(self):
+        """Проверяем, что оценка числа постов ленты подписок не сбрасывается
+        постами авторов, на которых пользователь не подписан."""
+        cache.clear()
+        self.user_client.get(reverse('posts:follow_index'))
+        scope = f'follow:{self.user.pk}'
+        key = f'follow_count:{self.user.pk}:{get_versions([scope])[scope]}'
+        self.assertEqual(cache.get(key), 0)
+        Post.objects.create(author=self.author, text='Пост')
+        self.assertEqual(
+            cache.get(
+                f'follow_count:{self.user.pk}:{get_versions([scope])[scope]}'
+            ),
+            0,
+        )
@@ -0,0 +1,134 @@
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from ..feed import FEED_KEYSET, fan_out_post, get_follow_feed
+from ..models import FeedEntry, Follow, Post, User
+from ..utils import get_keyset_page
+from .transactions import capture_on_commit_callbacks
+
+
+class FollowFeedTests(TestCase):
+    """Тестируем ленту подписок, собираемую при записи."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.follower = User.objects.create_user(username='follower')
+
+    def setUp(self):
+        cache.clear()
+        self.author_client = Client()
+        self.author_client.force_login(self.author)
+        self.follower_client = Client()
+        self.follower_client.force_login(self.follower)
+
+    def test_new_post_fan_out_to_followers(self):
+        """Проверяем, что новый пост попадает в ленту подписчика."""
+        self.follower_client.get(
+            reverse('posts:profile_follow', args=(self.author.username,))
+        )
+        with capture_on_commit_callbacks(execute=True):
+            self.author_client.post(
+                reverse('posts:post_create'), data={'text': 'Новый пост'},
+            )
+        post = Post.objects.get(text='Новый пост')
+        self.assertTrue(
+            FeedEntry.objects.filter(user=self.follower, post=post).exists()
+        )
+        self.assertIn(post, get_follow_feed(self.follower))
+
+    def test_post_created_outside_views_is_fanned_out(self):
+        """Проверяем, что пост, созданный не через форму (в админке,
+        из консоли), раскладывается по лентам после фиксации."""
+        Follow.objects.create(user=self.follower, author=self.author)
+        with capture_on_commit_callbacks() as callbacks:
+            post = Post.objects.create(author=self.author, text='Пост')
+        self.assertFalse(FeedEntry.objects.exists())
+        for callback in callbacks:
+            callback()
+        self.assertIn(post, get_follow_feed(self.follower))
+
+    def test_follow_backfill_and_unfollow_clear_feed(self):
+        """Проверяем наполнение ленты при подписке и очистку при отписке."""
+        post = Post.objects.create(author=self.author, text='Старый пост')
+        self.follower_client.get(
+            reverse('posts:profile_follow', args=(self.author.username,))
+        )
+        self.assertIn(post, get_follow_feed(self.follower))
+        self.follower_client.get(
+            reverse('posts:profile_unfollow', args=(self.author.username,))
+        )
+        self.assertFalse(
+            FeedEntry.objects.filter(user=self.follower).exists()
+        )
+
+    @override_settings(FEED_MAX_ENTRIES=3)
+    def test_feed_is_trimmed(self):
+        """Проверяем, что в ленте хранятся только последние записи."""
+        Follow.objects.create(user=self.follower, author=self.author)
+        posts = [
+            Post.objects.create(author=self.author, text=f'Пост {i}')
+            for i in range(5)
+        ]
+        for post in posts:
+            fan_out_post(post)
+        self.assertEqual(
+            FeedEntry.objects.filter(user=self.follower).count(), 3
+        )
+        self.assertNotIn(posts[0], get_follow_feed(self.follower))
+        self.assertIn(posts[-1], get_follow_feed(self.follower))
+
+    @override_settings(FEED_MAX_ENTRIES=3)
+    def test_trim_keeps_limit_on_equal_times(self):
+        """Проверяем, что записи с одинаковым временем не удаляются
+        сверх лимита."""
+        Follow.objects.create(user=self.follower, author=self.author)
+        posts = [
+            Post.objects.create(author=self.author, text=f'Пост {i}')
+            for i in range(5)
+        ]
+        Post.objects.update(created=posts[0].created)
+        for post in Post.objects.order_by('pk'):
+            fan_out_post(post)
+        self.assertEqual(
+            list(FeedEntry.objects.filter(user=self.follower).order_by(
+                'post',
+            ).values_list('post', flat=True)),
+            [post.pk for post in posts[2:]],
+        )
+
+    @override_settings(FEED_FANOUT_MAX_FOLLOWERS=0)
+    def test_popular_author_posts_merged_on_read(self):
+        """Проверяем, что посты популярного автора подмешиваются при
+        чтении, а не раскладываются по лентам."""
+        Follow.objects.create(user=self.follower, author=self.author)
+        post = Post.objects.create(author=self.author, text='Пост')
+        fan_out_post(post)
+        self.assertFalse(FeedEntry.objects.exists())
+        self.assertIn(post, get_follow_feed(self.follower))
+
+    def test_feed_pages_follow_feed_entries(self):
+        """Проверяем, что лента листается курсором по записям ленты
+        и страница выбирается по индексу (user, created)."""
+        Follow.objects.create(user=self.follower, author=self.author)
+        posts = [
+            Post.objects.create(author=self.author, text=f'Пост {i}')
+            for i in range(5)
+        ]
+        for post in posts:
+            fan_out_post(post)
+        feed = get_follow_feed(self.follower).for_feed()
+        self.assertIn(
+            'feed_user_created_idx',
+            feed.order_by('-feed_created', '-feed_pk').explain(),
+        )
+        shown = []
+        cursor = None
+        for _ in range(3):
+            page = get_keyset_page(feed, cursor, 2, FEED_KEYSET)
+            shown.extend(page)
+            cursor = page.next_cursor
+        self.assertEqual(shown, posts[::-1])
+        self.assertIsNone(cursor)
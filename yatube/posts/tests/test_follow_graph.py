@@ -0,0 +1,58 @@
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from ..feed import get_follow_feed
+from ..follow_graph import get_following_ids, is_following
+from ..models import Follow, User
+from .transactions import capture_on_commit_callbacks
+
+
+class FollowGraphTests(TestCase):
+    """Тестируем кэш подписок пользователя."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='user')
+        cls.authors = [
+            User.objects.create_user(username=f'author_{i}') for i in range(5)
+        ]
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.client.force_login(self.user)
+
+    def test_following_ids_are_sorted_and_cached(self):
+        """Проверяем, что подписки читаются из БД один раз."""
+        for author in reversed(self.authors[1:]):
+            Follow.objects.create(user=self.user, author=author)
+        self.assertEqual(
+            list(get_following_ids(self.user.pk)),
+            sorted(author.pk for author in self.authors[1:]),
+        )
+        with self.assertNumQueries(0):
+            self.assertTrue(is_following(self.user.pk, self.authors[2].pk))
+            self.assertFalse(is_following(self.user.pk, self.authors[0].pk))
+
+    def test_follow_and_unfollow_invalidate_cache(self):
+        """Проверяем, что подписка и отписка сбрасывают кэш."""
+        author = self.authors[0]
+        self.assertFalse(is_following(self.user.pk, author.pk))
+        with capture_on_commit_callbacks(execute=True):
+            self.client.get(
+                reverse('posts:profile_follow', args=(author.username,))
+            )
+        self.assertTrue(is_following(self.user.pk, author.pk))
+        with capture_on_commit_callbacks(execute=True):
+            self.client.get(
+                reverse('posts:profile_unfollow', args=(author.username,))
+            )
+        self.assertFalse(is_following(self.user.pk, author.pk))
+
+    def test_empty_follow_feed_skips_database(self):
+        """Проверяем, что лента без подписок не обращается к БД."""
+        get_following_ids(self.user.pk)
+        with self.assertNumQueries(0):
+            self.assertEqual(list(get_follow_feed(self.user)), [])
@@ -7,6 +7,7 @@ from django.core.files.uploadedfile import SimpleUploadedFile
 from django.test import Client, TestCase, override_settings
 from django.urls import reverse
 
+from ..media import storage
 from ..models import Comment, Group, Post, User
 
 TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
@@ -89,7 +90,9 @@ class PostFormCreateTests(TestCase):
             created_post.group: Group.objects.get(
                 id=settings.TEST_GROUP_INDEX
             ),
-            created_post.image: f'posts/{self.uploaded}'
+            created_post.image: storage.get_hashed_name(
+                f'posts/{self.uploaded}', self.uploaded,
+            ),
         }
         for (
             created_post_value, expected_value
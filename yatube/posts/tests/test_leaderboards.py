@@ -0,0 +1,136 @@
+from datetime import timedelta
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from ..leaderboards import compact_leaderboard, get_leaderboard
+from ..models import Group, LeaderboardEntry, Post, PostRating, User
+from ..ratings import set_rating
+
+
+class LeaderboardsTests(TestCase):
+    """Тестируем таблицы лучших постов за период."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.users = [
+            User.objects.create_user(username=f'user_{i}') for i in range(3)
+        ]
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        cls.post = Post.objects.create(
+            author=cls.author, text='Пост в группе', group=cls.group,
+        )
+        cls.other_post = Post.objects.create(author=cls.author, text='Пост')
+
+    def setUp(self):
+        cache.clear()
+
+    def scores(self, window, group_id=None):
+        return [
+            (entry.post_id, entry.score)
+            for entry in get_leaderboard(window, group_id)
+        ]
+
+    def test_ratings_update_all_windows_and_scopes(self):
+        """Проверяем, что оценка попадает во все периоды и области."""
+        for user in self.users:
+            set_rating(user, self.post.pk, True)
+        set_rating(self.users[0], self.other_post.pk, True)
+        set_rating(self.users[0], self.post.pk, False)
+        for window, _ in LeaderboardEntry.WINDOWS:
+            with self.subTest(window=window):
+                self.assertEqual(
+                    self.scores(window),
+                    [(self.post.pk, 2), (self.other_post.pk, 1)],
+                )
+                self.assertEqual(
+                    self.scores(window, self.group.pk), [(self.post.pk, 2)],
+                )
+
+    def test_old_rating_removal_keeps_short_windows(self):
+        """Проверяем, что снятие старой оценки не трогает сутки."""
+        set_rating(self.users[0], self.post.pk, True)
+        PostRating.objects.update(created=timezone.now() - timedelta(days=3))
+        call_command('compact_leaderboards', stdout=StringIO())
+        set_rating(self.users[1], self.post.pk, True)
+        set_rating(self.users[0], self.post.pk, False)
+        self.assertEqual(
+            self.scores(LeaderboardEntry.DAY), [(self.post.pk, 1)],
+        )
+        self.assertEqual(
+            self.scores(LeaderboardEntry.WEEK), [(self.post.pk, 1)],
+        )
+
+    def test_compaction_drops_expired_ratings(self):
+        """Проверяем, что пересчет убирает оценки старше периода."""
+        for user in self.users:
+            set_rating(user, self.post.pk, True)
+        PostRating.objects.filter(user=self.users[0]).update(
+            created=timezone.now() - timedelta(days=10),
+        )
+        call_command('compact_leaderboards', stdout=StringIO())
+        expected = {
+            LeaderboardEntry.DAY: [(self.post.pk, 2)],
+            LeaderboardEntry.WEEK: [(self.post.pk, 2)],
+            LeaderboardEntry.MONTH: [(self.post.pk, 3)],
+        }
+        for window, scores in expected.items():
+            with self.subTest(window=window):
+                self.assertEqual(self.scores(window), scores)
+                self.assertEqual(self.scores(window, self.group.pk), scores)
+
+    @override_settings(LEADERBOARD_KEEP=1)
+    def test_compaction_reads_ratings_once(self):
+        """Проверяем, что пересчет читает оценки одним запросом при любом
+        числе групп и оставляет в каждой области LEADERBOARD_KEEP постов."""
+        other_group = Group.objects.create(title='Другая', slug='other')
+        other_group_post = Post.objects.create(
+            author=self.author, text='Пост', group=other_group,
+        )
+        for user in self.users:
+            set_rating(user, self.post.pk, True)
+        set_rating(self.users[0], other_group_post.pk, True)
+        with CaptureQueriesContext(connection) as queries:
+            compact_leaderboard(LeaderboardEntry.DAY)
+        self.assertEqual(len([
+            query for query in queries
+            if 'posts_postrating' in query['sql']
+        ]), 1)
+        self.assertEqual(
+            self.scores(LeaderboardEntry.DAY), [(self.post.pk, 3)],
+        )
+        self.assertEqual(
+            self.scores(LeaderboardEntry.DAY, other_group.pk),
+            [(other_group_post.pk, 1)],
+        )
+
+    def test_pages_show_leaderboard(self):
+        """Проверяем блок лучших постов на главной и странице группы."""
+        set_rating(self.users[0], self.post.pk, True)
+        pages = (
+            reverse('posts:index'),
+            reverse('posts:group_list', args=(self.group.slug,)),
+        )
+        for page in pages:
+            with self.subTest(page=page):
+                response = Client().get(page, {'top': 'week'})
+                self.assertEqual(
+                    response.context['leaderboard_window'],
+                    LeaderboardEntry.WEEK,
+                )
+                self.assertContains(
+                    response,
+                    reverse('posts:post_detail', args=(self.post.pk,)),
+                )
@@ -0,0 +1,114 @@
+import shutil
+import tempfile
+from datetime import timedelta
+from io import StringIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import FileSystemStorage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from ..media import collect_garbage, find_orphans, storage
+from ..models import MediaFile, Post, User
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class MediaStorageTests(TestCase):
+    """Тестируем хранилище картинок по хэшу содержимого."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def make_post(self, name='small.gif'):
+        return Post.objects.create(
+            author=self.author,
+            text='Пост с картинкой',
+            image=SimpleUploadedFile(name, SMALL_GIF, 'image/gif'),
+        )
+
+    def get_refs(self, name):
+        return MediaFile.objects.get(name=name).refs
+
+    def test_duplicates_share_one_file(self):
+        """Проверяем, что одинаковые картинки хранятся одним файлом
+        в каталоге по хэшу."""
+        first = self.make_post('first.gif')
+        second = self.make_post('second.GIF')
+        self.assertEqual(first.image.name, second.image.name)
+        self.assertTrue(storage.is_hashed(first.image.name))
+        self.assertRegex(first.image.name, r'^posts/(..)/(..)/\1\2.+\.gif$')
+        self.assertEqual(self.get_refs(first.image.name), 2)
+
+    def test_unreferenced_file_is_collected(self):
+        """Проверяем, что файл удаляется только без ссылок
+        и после срока ожидания."""
+        first = self.make_post()
+        second = self.make_post()
+        name = first.image.name
+        first.delete()
+        self.assertEqual(collect_garbage(grace=0), 0)
+        second.image = SimpleUploadedFile('other.gif', SMALL_GIF + b'\0')
+        second.save()
+        self.assertEqual(self.get_refs(name), 0)
+        self.assertEqual(collect_garbage(), 0)
+        self.assertEqual(collect_garbage(grace=0), 1)
+        self.assertFalse(storage.exists(name))
+        self.assertFalse(MediaFile.objects.filter(name=name).exists())
+        self.assertTrue(storage.exists(second.image.name))
+
+    def test_reuploaded_file_survives_collection(self):
+        """Проверяем, что файл со свежим временем изменения не удаляется,
+        даже если учет ссылок давно не менялся, и учет сохраняется."""
+        post = self.make_post()
+        name = post.image.name
+        post.delete()
+        MediaFile.objects.filter(name=name).update(
+            changed=timezone.now() - timedelta(hours=1),
+        )
+        self.assertEqual(collect_garbage(grace=60), 0)
+        self.assertTrue(storage.exists(name))
+        self.assertEqual(self.get_refs(name), 0)
+
+    def test_orphans_are_found(self):
+        """Проверяем, что файл вне учета находится обходом каталогов."""
+        post = self.make_post()
+        orphan = storage.save('posts/lost.gif', ContentFile(b'lost'))
+        self.assertEqual(list(find_orphans(grace=0)), [orphan])
+        self.assertTrue(storage.exists(post.image.name))
+
+    def test_migrate_media_moves_flat_files(self):
+        """Проверяем перенос картинок из плоского каталога."""
+        legacy = FileSystemStorage().save(
+            'posts/legacy.gif', ContentFile(SMALL_GIF),
+        )
+        post = Post.objects.create(
+            author=self.author, text='Старый пост', image=legacy,
+        )
+        out = StringIO()
+        call_command('migrate_media', chunk_size=1, stdout=out)
+        post.refresh_from_db()
+        self.assertTrue(storage.is_hashed(post.image.name))
+        self.assertFalse(storage.exists(legacy))
+        self.assertEqual(self.get_refs(post.image.name), 1)
+        self.assertFalse(MediaFile.objects.filter(name=legacy).exists())
+        self.assertIn('перенесено 1', out.getvalue())
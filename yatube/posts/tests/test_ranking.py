@@ -0,0 +1,85 @@
+from datetime import timedelta
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from ..models import Post, User
+from ..ranking import get_hot_score
+from ..ratings import set_rating
+
+
+class HotScoreTests(TestCase):
+    """Тестируем хранимую популярность постов."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.users = [
+            User.objects.create_user(username=f'user_{i}') for i in range(3)
+        ]
+
+    def setUp(self):
+        cache.clear()
+
+    def test_score_decays_with_age(self):
+        """Проверяем, что оценки поднимают популярность, а возраст снижает."""
+        now = timezone.now()
+        self.assertGreater(
+            get_hot_score(2, now, now), get_hot_score(1, now, now),
+        )
+        self.assertGreater(
+            get_hot_score(1, now, now),
+            get_hot_score(1, now - timedelta(hours=5), now),
+        )
+        self.assertEqual(get_hot_score(100, now - timedelta(days=30), now), 0)
+
+    def test_new_post_and_ratings_update_score(self):
+        """Проверяем, что популярность хранится и меняется с оценками."""
+        post = Post.objects.create(author=self.author, text='Пост')
+        self.assertGreater(post.hot_score, 0)
+        initial = post.hot_score
+        set_rating(self.users[0], post.pk, True)
+        post.refresh_from_db()
+        self.assertGreater(post.hot_score, initial)
+
+    def test_decay_command_resets_old_posts(self):
+        """Проверяем, что пересчет обнуляет устаревшие посты."""
+        post = Post.objects.create(author=self.author, text='Пост')
+        Post.objects.filter(pk=post.pk).update(
+            created=timezone.now() - timedelta(days=30),
+        )
+        fresh = Post.objects.create(author=self.author, text='Свежий пост')
+        call_command('decay_hot_scores', stdout=StringIO())
+        post.refresh_from_db()
+        fresh.refresh_from_db()
+        self.assertEqual(post.hot_score, 0)
+        self.assertGreater(fresh.hot_score, 0)
+
+    @override_settings(POSTS_PER_PAGE=2)
+    def test_hot_page_is_ordered_by_score(self):
+        """Проверяем порядок и курсорное листание популярных постов."""
+        posts = [
+            Post.objects.create(author=self.author, text=f'Пост {i}')
+            for i in range(5)
+        ]
+        for user in self.users:
+            set_rating(user, posts[0].pk, True)
+        set_rating(self.users[0], posts[1].pk, True)
+        expected = list(Post.objects.order_by('-hot_score', '-pk'))
+        self.assertEqual(expected[:2], [posts[0], posts[1]])
+        client = Client()
+        seen = []
+        params = {}
+        while True:
+            response = client.get(reverse('posts:index_hot'), params)
+            page_obj = response.context['page_obj']
+            seen.extend(page_obj)
+            if not page_obj.has_next():
+                break
+            params = {'cursor': page_obj.next_cursor}
+        self.assertEqual(seen, expected)
@@ -0,0 +1,107 @@
+from io import StringIO
+
+import numpy as np
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import Client, TestCase
+from django.urls import reverse
+from scipy import sparse
+
+from ..models import Follow, Recommendation, User
+from ..recommendations import get_similarity, save_recommendations
+from .transactions import capture_on_commit_callbacks
+
+
+class RecommendationsTests(TestCase):
+    """Тестируем рекомендации авторов для подписки."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.users = {
+            name: User.objects.create_user(username=name)
+            for name in ('reader', 'similar', 'other', 'lev', 'anna', 'boris')
+        }
+        follows = {
+            'reader': ('lev',),
+            'similar': ('lev', 'anna'),
+            'other': ('boris', 'reader'),
+        }
+        for user, authors in follows.items():
+            for author in authors:
+                Follow.objects.create(
+                    user=cls.users[user], author=cls.users[author],
+                )
+
+    def setUp(self):
+        cache.clear()
+
+    def build(self, *args):
+        call_command('build_recommendations', *args, stdout=StringIO())
+
+    def test_co_followed_author_is_recommended(self):
+        """Проверяем, что рекомендуется автор с общими читателями."""
+        self.build('--chunk-size', '2')
+        recommended = Recommendation.objects.filter(
+            user=self.users['reader'],
+        ).values_list('author__username', flat=True)
+        self.assertEqual(list(recommended), ['anna'])
+        self.assertFalse(Recommendation.objects.filter(
+            user=self.users['similar'],
+        ).exists())
+
+    def test_rebuild_replaces_recommendations(self):
+        """Проверяем, что повторный расчет не дублирует рекомендации."""
+        self.build()
+        total = Recommendation.objects.count()
+        self.build('--with-ratings')
+        self.assertEqual(Recommendation.objects.count(), total)
+
+    def test_old_recommendations_kept_while_computing(self):
+        """Проверяем, что старые рекомендации удаляются только после
+        расчета новых."""
+        self.build()
+        total = Recommendation.objects.count()
+
+        def rows():
+            self.assertEqual(Recommendation.objects.count(), total)
+            yield self.users['boris'].pk, self.users['anna'].pk, 1.0
+
+        self.assertEqual(save_recommendations(rows()), 1)
+        self.assertEqual(
+            list(Recommendation.objects.values_list('user', 'author')),
+            [(self.users['boris'].pk, self.users['anna'].pk)],
+        )
+
+    def test_similarity_blocks_match_full_product(self):
+        """Проверяем, что сходство по блокам авторов совпадает с расчетом
+        одним блоком и у каждого автора не больше neighbours соседей."""
+        matrix = sparse.random(
+            40, 15, density=0.3, format='csr',
+            random_state=np.random.RandomState(1),
+        )
+        blocked = get_similarity(matrix, 3, block_size=4)
+        whole = get_similarity(matrix, 3, block_size=15)
+        self.assertEqual((blocked != whole).nnz, 0)
+        self.assertLessEqual(np.diff(blocked.indptr).max(), 3)
+        self.assertFalse(blocked.diagonal().any())
+
+    def test_pages_show_suggestions(self):
+        """Проверяем блок рекомендаций на страницах профиля и подписок."""
+        self.build()
+        client = Client()
+        client.force_login(self.users['reader'])
+        pages = (
+            reverse('posts:profile', args=('lev',)),
+            reverse('posts:follow_index'),
+        )
+        for page in pages:
+            with self.subTest(page=page):
+                response = client.get(page)
+                self.assertEqual(
+                    response.context['suggestions'], [self.users['anna']],
+                )
+        with capture_on_commit_callbacks(execute=True):
+            client.get(reverse('posts:profile_follow', args=('anna',)))
+        response = client.get(reverse('posts:follow_index'))
+        self.assertEqual(response.context['suggestions'], [])
@@ -0,0 +1,152 @@
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from ..models import Comment, Post, User
+from ..checks import check_search_triggers
+from ..search import POST_INDEX, filter_posts
+
+
+class SearchTests(TestCase):
+    """Тестируем полнотекстовый поиск по постам и комментариям."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.post = Post.objects.create(
+            author=cls.author,
+            text='Ёжик в тумане, где бродит лошадка',
+        )
+        cls.other_post = Post.objects.create(
+            author=cls.author,
+            text='Лошадка, лошадка и еще раз лошадка <b>жирная</b>',
+        )
+        cls.comment = Comment.objects.create(
+            post=cls.post,
+            author=cls.author,
+            text='Комментарий про туман',
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+
+    def search(self, query, **params):
+        return self.client.get(
+            reverse('posts:search'), {'q': query, **params},
+        )
+
+    def get_results(self, query):
+        return list(self.search(query).context['page_obj'])
+
+    def test_results_are_ranked_and_highlighted(self):
+        """Проверяем ранжирование по BM25 и выделение найденных слов."""
+        results = self.get_results('лошадка')
+        self.assertEqual(
+            [result['object'] for result in results],
+            [self.other_post, self.post],
+        )
+        self.assertIn('<mark>Лошадка</mark>', results[0]['snippet'])
+        self.assertIn('&lt;b&gt;', results[0]['snippet'])
+
+    def test_posts_and_comments_are_interleaved(self):
+        """Проверяем, что посты и комментарии ранжируются каждый в своем
+        индексе и чередуются в выдаче."""
+        comment = Comment.objects.create(
+            post=self.post, author=self.author, text='Лошадка в тумане',
+        )
+        results = self.get_results('лошадка')
+        self.assertEqual(
+            [result['object'] for result in results],
+            [self.other_post, comment, self.post],
+        )
+
+    def test_comments_are_found(self):
+        """Проверяем поиск по комментариям, по префиксу слова
+        и без учета регистра."""
+        results = self.get_results('ТУМАН* ёжик')
+        self.assertEqual([result['object'] for result in results], [
+            self.post,
+        ])
+        results = self.get_results('туман')
+        self.assertEqual([result['object'] for result in results], [
+            self.comment,
+        ])
+        response = self.search('туман')
+        self.assertContains(response, reverse(
+            'posts:comment_thread', args=(self.post.pk, self.comment.pk),
+        ))
+
+    def test_index_follows_changes(self):
+        """Проверяем, что индекс обновляется при изменении и удалении."""
+        Post.objects.filter(pk=self.other_post.pk).update(
+            text='Совсем другое',
+        )
+        self.assertEqual(len(self.get_results('лошадка')), 1)
+        Post.objects.filter(pk=self.post.pk).delete()
+        self.assertEqual(self.get_results('лошадка'), [])
+        self.assertEqual(len(self.get_results('другое')), 1)
+
+    def test_query_syntax_is_escaped(self):
+        """Проверяем, что операторы FTS5 в запросе не ломают поиск."""
+        for query in ('"лошадка', 'NEAR(', 'ло*', '*', 'a OR', ':-)'):
+            with self.subTest(query=query):
+                self.assertEqual(self.search(query).status_code, 200)
+
+    @override_settings(POSTS_PER_PAGE=1)
+    def test_results_are_paginated(self):
+        """Проверяем, что ссылки пагинатора сохраняют запрос, а страницы
+        продолжают чередование постов и комментариев."""
+        comment = Comment.objects.create(
+            post=self.post, author=self.author, text='Лошадка в тумане',
+        )
+        response = self.search('лошадка')
+        self.assertEqual(len(response.context['page_obj']), 1)
+        self.assertContains(response, '?q=%D0%BB%D0%BE')
+        for page, expected in enumerate(
+            (self.other_post, comment, self.post), start=1,
+        ):
+            with self.subTest(page=page):
+                response = self.search('лошадка', page=page)
+                self.assertEqual(
+                    response.context['page_obj'][0]['object'], expected,
+                )
+
+    def test_admin_search_without_words(self):
+        """Проверяем, что поиск в админке по запросу без слов
+        ничего не находит и не падает."""
+        self.assertFalse(filter_posts(Post.objects.all(), '*').exists())
+        admin = User.objects.create_superuser(
+            username='admin', email='admin@example.com', password='pass',
+        )
+        self.client.force_login(admin)
+        response = self.client.get(
+            reverse('admin:posts_post_changelist'), {'q': '*'},
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['cl'].result_count, 0)
+
+    def test_rebuild_restores_index(self):
+        """Проверяем, что команда перестраивает индекс."""
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"INSERT INTO {POST_INDEX}({POST_INDEX}) "
+                f"VALUES ('delete-all')"
+            )
+        self.assertFalse(filter_posts(Post.objects.all(), 'лошадка'))
+        call_command('rebuild_search_index', verbosity=0)
+        self.assertEqual(
+            filter_posts(Post.objects.all(), 'лошадка').count(), 2,
+        )
+
+    def test_missing_triggers_are_reported(self):
+        """Проверяем, что проверка находит пропавший триггер индекса."""
+        self.assertEqual(check_search_triggers(None), [])
+        with connection.cursor() as cursor:
+            cursor.execute(f'DROP TRIGGER {POST_INDEX}_update')
+        issues = check_search_triggers(None)
+        self.assertEqual([issue.id for issue in issues], ['posts.W001'])
+        self.assertIn(f'{POST_INDEX}_update', issues[0].msg)
@@ -0,0 +1,157 @@
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from ..fragments import get_invalidation_stats, get_versions
+from ..models import Comment, Follow, Group, Post, PostRating, User
+from .transactions import capture_on_commit_callbacks
+
+
+class CacheInvalidationTests(TestCase):
+    """Тестируем сброс версий кэша по сигналам моделей."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.user = User.objects.create_user(username='user')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        cls.other_group = Group.objects.create(
+            title='Другая группа',
+            slug='other-slug',
+            description='Тестовое описание',
+        )
+        cls.post = Post.objects.create(
+            author=cls.author, text='Тестовый пост', group=cls.group,
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.client.force_login(self.user)
+
+    def assert_bumped(self, write, bumped, kept=()):
+        scopes = [*bumped, *kept]
+        before = get_versions(scopes)
+        with capture_on_commit_callbacks(execute=True):
+            write()
+        after = get_versions(scopes)
+        for scope in bumped:
+            with self.subTest(scope=scope):
+                self.assertNotEqual(before[scope], after[scope])
+        for scope in kept:
+            with self.subTest(scope=scope):
+                self.assertEqual(before[scope], after[scope])
+
+    def test_post_save_bumps_its_pages(self):
+        """Проверяем, что пост сбрасывает главную, профиль, старую
+        и новую группы, но не трогает чужие страницы."""
+        def write():
+            self.post.group = self.other_group
+            self.post.save()
+        self.assert_bumped(
+            write,
+            bumped=(
+                'index',
+                f'post:{self.post.pk}',
+                f'profile:{self.author.pk}',
+                f'group:{self.group.pk}',
+                f'group:{self.other_group.pk}',
+            ),
+            kept=(f'profile:{self.user.pk}', f'post_detail:{self.post.pk}'),
+        )
+
+    def test_comment_and_rating_bump_only_post_detail(self):
+        """Проверяем, что комментарии и оценки сбрасывают только
+        страницу поста."""
+        for write in (
+            lambda: Comment.objects.create(
+                post=self.post, author=self.user, text='Комментарий',
+            ),
+            lambda: PostRating.objects.create(post=self.post, user=self.user),
+        ):
+            self.assert_bumped(
+                write,
+                bumped=(f'post_detail:{self.post.pk}',),
+                kept=('index', f'post:{self.post.pk}'),
+            )
+
+    def test_follow_and_group_bump_their_pages(self):
+        """Проверяем сброс страниц при подписке и правке группы."""
+        self.assert_bumped(
+            lambda: Follow.objects.create(user=self.user, author=self.author),
+            bumped=(
+                f'follow:{self.user.pk}',
+                f'profile:{self.author.pk}',
+            ),
+            kept=('index',),
+        )
+        self.assert_bumped(
+            lambda: Group.objects.filter(pk=self.group.pk).get().save(),
+            bumped=(
+                'index',
+                f'group:{self.group.pk}',
+                f'profile:{self.author.pk}',
+            ),
+            kept=(f'profile:{self.user.pk}',),
+        )
+
+    def test_group_rename_shown_on_cached_feeds(self):
+        """Проверяем, что закэшированные ленты показывают новую ссылку
+        на переименованную группу."""
+        pages = (
+            reverse('posts:index'),
+            reverse('posts:profile', args=(self.author.username,)),
+        )
+        for page in pages:
+            self.client.get(page)
+        group = Group.objects.get(pk=self.group.pk)
+        group.slug = 'renamed-slug'
+        with capture_on_commit_callbacks(execute=True):
+            group.save()
+        for page in pages:
+            with self.subTest(page=page):
+                self.assertContains(
+                    self.client.get(page),
+                    reverse('posts:group_list', args=('renamed-slug',)),
+                )
+
+    def test_invalidation_is_counted(self):
+        """Проверяем счетчик сброшенных ключей на одну запись."""
+        with capture_on_commit_callbacks(execute=True):
+            Comment.objects.create(
+                post=self.post, author=self.user, text='Комментарий',
+            )
+        stats = get_invalidation_stats()
+        self.assertEqual(stats['writes'], 1)
+        self.assertEqual(stats['invalidated_keys'], 1)
+
+    def test_new_comment_shown_on_cached_post_detail(self):
+        """Проверяем, что закэшированная страница поста показывает
+        новый комментарий."""
+        url = reverse('posts:post_detail', args=(self.post.pk,))
+        self.client.get(url)
+        with capture_on_commit_callbacks(execute=True):
+            self.client.post(
+                reverse('posts:add_comment', args=(self.post.pk,)),
+                data={'text': 'Свежий комментарий'},
+            )
+        self.assertContains(self.client.get(url), 'Свежий комментарий')
+
+    def test_versions_bumped_after_commit(self):
+        """Проверяем, что версии сбрасываются только после фиксации
+        транзакции."""
+        scopes = [f'post_detail:{self.post.pk}']
+        before = get_versions(scopes)
+        with capture_on_commit_callbacks() as callbacks:
+            Comment.objects.create(
+                post=self.post, author=self.user, text='Комментарий',
+            )
+        self.assertEqual(get_versions(scopes), before)
+        self.assertEqual(len(callbacks), 1)
+        callbacks[0]()
+        self.assertNotEqual(get_versions(scopes), before)
@@ -0,0 +1,328 @@
+import shutil
+import tempfile
+from io import BytesIO, StringIO
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from PIL import Image
+from sorl.thumbnail import get_thumbnail
+
+from ..models import Counter, Group, Post, PostImageVariant, User
+from ..thumbnail_cache import backend
+from ..thumbnails import (BACKFILL_PROGRESS, backfill_thumbnails,
+                          get_lock_key, make_thumbnails, schedule_thumbnails)
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+GEOMETRY, OPTIONS = settings.THUMBNAIL_GEOMETRIES[0]
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT, THUMBNAIL_WORKERS=0)
+class ThumbnailsTests(TestCase):
+    """Тестируем подготовку миниатюр после загрузки картинки."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.client.force_login(self.author)
+
+    def make_post(self, name='small.gif', content=SMALL_GIF):
+        return Post.objects.create(
+            author=self.author,
+            text='Пост с картинкой',
+            image=SimpleUploadedFile(name, content, 'image/gif'),
+        )
+
+    def get_ready(self, post):
+        return backend.get_ready_thumbnail(post.image, GEOMETRY, **OPTIONS)
+
+    def test_schedule_makes_template_geometries(self):
+        """Проверяем, что после постановки в очередь миниатюра готова."""
+        post = self.make_post()
+        self.assertIsNone(self.get_ready(post))
+        schedule_thumbnails(post)
+        thumbnail = self.get_ready(post)
+        self.assertEqual(f'{thumbnail.width}x{thumbnail.height}', GEOMETRY)
+
+    def test_duplicate_requests_are_coalesced(self):
+        """Проверяем, что картинка в обработке не ставится повторно."""
+        post = self.make_post('busy.gif')
+        cache.add(get_lock_key(post.pk, post.image.name), 1)
+        schedule_thumbnails(post)
+        self.assertIsNone(self.get_ready(post))
+
+    def test_page_renders_original_until_thumbnail_is_ready(self):
+        """Проверяем, что страница не ждет обработки картинки."""
+        post = self.make_post('late.gif')
+        cache.add(get_lock_key(post.pk, post.image.name), 1)
+        response = self.client.get(
+            reverse('posts:post_detail', args=(post.pk,)),
+        )
+        self.assertContains(response, post.image.url)
+
+    def test_post_create_prepares_thumbnail(self):
+        """Проверяем, что новый пост получает миниатюру сразу."""
+        self.client.post(
+            reverse('posts:post_create'),
+            data={
+                'text': 'Новый пост',
+                'image': SimpleUploadedFile('new.gif', SMALL_GIF, 'image/gif'),
+            },
+        )
+        post = Post.objects.get(text='Новый пост')
+        thumbnail = self.get_ready(post)
+        self.assertIsNotNone(thumbnail)
+        response = self.client.get(
+            reverse('posts:post_detail', args=(post.pk,)),
+        )
+        self.assertContains(response, thumbnail.url)
+
+    def test_cached_feeds_show_variants_when_ready(self):
+        """Проверяем, что закэшированные ленты показывают копии картинки
+        для srcset, как только они готовы."""
+        group = Group.objects.create(title='Группа', slug='thumbs')
+        post = Post.objects.create(
+            author=self.author,
+            group=group,
+            text='Пост с картинкой',
+            image=SimpleUploadedFile('cached.gif', SMALL_GIF, 'image/gif'),
+        )
+        pages = (
+            reverse('posts:index'),
+            reverse('posts:profile', args=(self.author.username,)),
+            reverse('posts:group_list', args=(group.slug,)),
+        )
+        cache.add(get_lock_key(post.pk, post.image.name), 1)
+        for page in pages:
+            self.assertNotContains(self.client.get(page), 'srcset=')
+        make_thumbnails(post.pk, post.image.name)
+        for page in pages:
+            with self.subTest(page=page):
+                self.assertContains(self.client.get(page), 'srcset=')
+
+    @override_settings(THUMBNAIL_WORKERS=2)
+    def test_feed_page_looks_thumbnails_up_in_one_batch(self):
+        """Проверяем, что миниатюры страницы ищутся одним запросом."""
+        posts = []
+        for i in range(3):
+            buffer = BytesIO()
+            Image.new('RGB', (2, 1), (i, 0, 0)).save(buffer, format='GIF')
+            posts.append(self.make_post(f'feed_{i}.gif', buffer.getvalue()))
+        get_thumbnail(posts[0].image, GEOMETRY, **OPTIONS)
+        cache.clear()
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('posts:index'))
+        kvstore_queries = [
+            query for query in queries
+            if 'thumbnail_kvstore' in query['sql']
+        ]
+        self.assertEqual(len(kvstore_queries), 1)
+        self.assertContains(response, self.get_ready(posts[0]).url)
+        self.assertContains(response, posts[1].image.url)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT, THUMBNAIL_WORKERS=0)
+class ImageVariantsTests(TestCase):
+    """Тестируем копии картинки поста для srcset."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        buffer = BytesIO()
+        Image.new('RGB', (800, 600), 'red').save(buffer, format='JPEG')
+        self.post = Post.objects.create(
+            author=self.author,
+            text='Пост с большой картинкой',
+            image=SimpleUploadedFile('big.jpg', buffer.getvalue()),
+        )
+        schedule_thumbnails(self.post)
+
+    def test_variants_are_stored_with_metadata(self):
+        """Проверяем ширины копий, их размеры и заглушку."""
+        variants = self.post.image_variants.filter(
+            format=PostImageVariant.JPEG,
+        )
+        self.assertEqual(
+            [(variant.width, variant.height) for variant in variants],
+            [(320, 113), (640, 226)],
+        )
+        for variant in variants:
+            self.assertGreater(variant.size, 0)
+        self.post.refresh_from_db()
+        self.assertTrue(
+            self.post.image_placeholder.startswith('data:image/jpeg;base64,')
+        )
+
+    def test_feed_card_has_srcset(self):
+        """Проверяем srcset в карточке и отсутствие запросов к копиям
+        при закэшированной карточке."""
+        response = Client().get(reverse('posts:index'))
+        self.assertContains(response, 'srcset=')
+        self.assertContains(response, '640w')
+        self.assertContains(response, settings.IMAGE_VARIANT_SIZES)
+        with CaptureQueriesContext(connection) as queries:
+            Client().get(reverse('posts:index'))
+        self.assertFalse(any(
+            'postimagevariant' in query['sql'] for query in queries
+        ))
+
+
+@override_settings(
+    MEDIA_ROOT=TEMP_MEDIA_ROOT,
+    THUMBNAIL_WORKERS=0,
+    IMAGE_ORIGINAL_MAX_SIDE=400,
+)
+class OriginalImageTests(TestCase):
+    """Тестируем ограничения загрузки и обработку оригинала."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.client.force_login(self.author)
+
+    def create_post(self, name, content):
+        return self.client.post(
+            reverse('posts:post_create'),
+            data={
+                'text': 'Пост с картинкой',
+                'image': SimpleUploadedFile(name, content),
+            },
+        )
+
+    @override_settings(FILE_UPLOAD_MAX_SIZE=len(SMALL_GIF) - 1)
+    def test_oversized_file_is_rejected(self):
+        """Проверяем, что файл больше лимита не принимается."""
+        response = self.create_post('big.gif', SMALL_GIF)
+        self.assertFormError(
+            response, 'form', 'image', 'Файл больше 0 МБ.',
+        )
+        self.assertFalse(Post.objects.exists())
+
+    @override_settings(IMAGE_UPLOAD_MAX_PIXELS=1)
+    def test_too_many_pixels_are_rejected(self):
+        """Проверяем, что размеры из заголовка проверяются."""
+        response = self.create_post('wide.gif', SMALL_GIF)
+        self.assertFormError(
+            response, 'form', 'image', 'Картинка больше 0 мегапикселей.',
+        )
+
+    def test_original_is_downscaled_without_exif(self):
+        """Проверяем, что оригинал уменьшен, EXIF удален, а размеры
+        сохранены в посте."""
+        exif = Image.Exif()
+        exif[0x0110] = 'Camera'
+        buffer = BytesIO()
+        Image.new('RGB', (1000, 500), 'blue').save(
+            buffer, format='JPEG', exif=exif,
+        )
+        self.create_post('photo.jpg', buffer.getvalue())
+        post = Post.objects.get()
+        self.assertEqual((post.image_width, post.image_height), (400, 200))
+        self.assertEqual(post.image_size, post.image.size)
+        with Image.open(post.image) as image:
+            self.assertEqual(image.size, (400, 200))
+            self.assertFalse(image.getexif())
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT, THUMBNAIL_WORKERS=0)
+class BackfillTests(TestCase):
+    """Тестируем подготовку миниатюр всех картинок командой."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        self.posts = []
+        for i in range(3):
+            buffer = BytesIO()
+            Image.new('RGB', (400, 300), (i, 0, 0)).save(
+                buffer, format='JPEG',
+            )
+            self.posts.append(Post.objects.create(
+                author=self.author,
+                text=f'Пост {i}',
+                image=SimpleUploadedFile(f'photo_{i}.jpg', buffer.getvalue()),
+            ))
+        Post.objects.create(author=self.author, text='Пост без картинки')
+
+    def test_command_prepares_all_images(self):
+        """Проверяем, что команда готовит миниатюры и копии всех картинок
+        и сообщает скорость."""
+        out = StringIO()
+        call_command('backfill_thumbnails', chunk_size=2, stdout=out)
+        for post in self.posts:
+            with self.subTest(post=post):
+                self.assertIsNotNone(backend.get_ready_thumbnail(
+                    post.image, GEOMETRY, **OPTIONS,
+                ))
+                self.assertTrue(post.image_variants.exists())
+        self.assertIn('готово 3', out.getvalue())
+        self.assertIn('картинок/с', out.getvalue())
+        self.assertEqual(Counter.objects.get(name=BACKFILL_PROGRESS).value, 0)
+
+    def test_interrupted_run_resumes(self):
+        """Проверяем, что прерванный запуск продолжается с места
+        остановки, а занятые картинки пропускаются."""
+        cache.add(get_lock_key(self.posts[1].pk, self.posts[1].image.name), 1)
+        chunks = backfill_thumbnails(chunk_size=1, workers=0)
+        self.assertEqual(next(chunks)['done'], 1)
+        self.assertEqual(next(chunks)['skipped'], 1)
+        chunks.close()
+        self.assertEqual(
+            Counter.objects.get(name=BACKFILL_PROGRESS).value,
+            self.posts[1].pk,
+        )
+        chunks = list(backfill_thumbnails(chunk_size=10, workers=0))
+        self.assertEqual(len(chunks), 1)
+        self.assertEqual(chunks[0]['done'], 1)
+        self.assertFalse(self.posts[1].image_variants.exists())
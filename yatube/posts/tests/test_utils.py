@@ -1,10 +1,14 @@
+from http import HTTPStatus
+
 from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.core.cache import cache
-from django.test import Client, TestCase
+from django.test import Client, TestCase, override_settings
 from django.urls import reverse
 
+from ..counters import recount_groups
 from ..models import Group, Post
+from ..utils import encode_cursor, get_page_window
 
 User = get_user_model()
 POSTS_IN_TEST_PAGINATOR = 13
@@ -26,6 +30,7 @@ class PaginatorViewsTest(TestCase):
             group=cls.group,
         ) for i in range(POSTS_IN_TEST_PAGINATOR)]
         Post.objects.bulk_create(cls.posts)
+        recount_groups(Group.objects.all())
 
     def setUp(self):
         self.authorized_client = Client()
@@ -62,3 +67,122 @@ class PaginatorViewsTest(TestCase):
                 self.assertEqual(
                     len(response.context['page_obj']), sum_of_post
                 )
+
+    def test_cursor_pages_contains_correct_records(self):
+        """Проверяем, что курсоры ведут на соседние страницы."""
+        pages = (
+            reverse('posts:index'),
+            reverse('posts:group_list', args=(self.group.slug,)),
+            reverse('posts:profile', args=(self.user.username,)),
+        )
+        for page in pages:
+            with self.subTest(page=page):
+                first_page = self.authorized_client.get(page).context[
+                    'page_obj'
+                ]
+                second_page = self.authorized_client.get(
+                    page, {'cursor': first_page.next_cursor}
+                ).context['page_obj']
+                self.assertEqual(
+                    len(second_page),
+                    POSTS_IN_TEST_PAGINATOR - settings.POSTS_PER_PAGE,
+                )
+                self.assertFalse(second_page.has_next())
+                self.assertTrue(second_page.has_previous())
+                self.assertFalse(
+                    set(first_page) & set(second_page)
+                )
+                previous_page = self.authorized_client.get(
+                    page, {'cursor': second_page.previous_cursor}
+                ).context['page_obj']
+                self.assertEqual(list(previous_page), list(first_page))
+
+    def test_cursor_in_follow_index(self):
+        """Проверяем курсорную пагинацию ленты подписок."""
+        follower = User.objects.create_user(username='follower')
+        follower_client = Client()
+        follower_client.force_login(follower)
+        follower_client.get(
+            reverse('posts:profile_follow', args=(self.user.username,))
+        )
+        first_page = follower_client.get(
+            reverse('posts:follow_index')
+        ).context['page_obj']
+        second_page = follower_client.get(
+            reverse('posts:follow_index'),
+            {'cursor': first_page.next_cursor},
+        ).context['page_obj']
+        self.assertEqual(
+            len(second_page),
+            POSTS_IN_TEST_PAGINATOR - settings.POSTS_PER_PAGE,
+        )
+
+    def test_broken_cursor_returns_first_page(self):
+        """Проверяем, что битый курсор открывает первую страницу."""
+        tokens = ['не-курсор'] + [
+            encode_cursor(values, 'next') for values in (
+                [[1], [2]], [{'a': 1}, 1], [None, None],
+            )
+        ]
+        urls = (
+            reverse('posts:index'),
+            reverse('posts:group_list', args=(self.group.slug,)),
+        )
+        for url in urls:
+            for token in tokens:
+                with self.subTest(url=url, token=token):
+                    response = self.authorized_client.get(
+                        url, {'cursor': token},
+                    )
+                    self.assertEqual(
+                        len(response.context['page_obj']),
+                        settings.POSTS_PER_PAGE,
+                    )
+
+    def test_invalid_cursor_values_return_404(self):
+        """Проверяем, что курсор с неподходящими значениями дает 404."""
+        for values in (['не-дата', 1], [1.5, 1]):
+            with self.subTest(values=values):
+                response = self.authorized_client.get(
+                    reverse('posts:index'),
+                    {'cursor': encode_cursor(values, 'next')},
+                )
+                self.assertEqual(
+                    response.status_code, HTTPStatus.NOT_FOUND,
+                )
+
+    def test_page_number_is_bounded(self):
+        """Проверяем, что номер страницы ограничен сверху."""
+        response = self.authorized_client.get(
+            reverse('posts:index'),
+            {'page': settings.PAGINATOR_MAX_PAGE + 1},
+        )
+        self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
+
+    @override_settings(POSTS_PER_PAGE=1)
+    def test_paginator_renders_only_page_window(self):
+        """Проверяем, что выводятся ссылки только на окно страниц."""
+        response = self.authorized_client.get(reverse('posts:index'))
+        self.assertContains(response, '?page=3"')
+        self.assertNotContains(response, '?page=4"')
+        self.assertContains(
+            response, f'?page={POSTS_IN_TEST_PAGINATOR}"', count=2,
+        )
+
+
+class PageWindowTest(TestCase):
+    """Тестируем окно номеров страниц пагинатора."""
+
+    def test_page_window(self):
+        """Проверяем края, окно вокруг текущей страницы и пропуски."""
+        windows = {
+            (1, 1): [1],
+            (1, 5): [1, 2, 3, 4, 5],
+            (1, 100): [1, 2, 3, None, 100],
+            (50, 100): [1, None, 48, 49, 50, 51, 52, None, 100],
+            (100, 100): [1, None, 98, 99, 100],
+            (4, 100): [1, 2, 3, 4, 5, 6, None, 100],
+        }
+        for (number, last), expected in windows.items():
+            with self.subTest(number=number, last=last):
+                self.assertEqual(get_page_window(number, last), expected)
@@ -1,5 +1,6 @@
 import shutil
 import tempfile
+from http import HTTPStatus
 
 from django import forms
 from django.conf import settings
@@ -8,9 +9,13 @@ from django.core.files.uploadedfile import SimpleUploadedFile
 from django.test import Client, TestCase, override_settings
 from django.urls import reverse
 
+from ..counters import get_profile
+from ..feed import backfill_feed
 from ..forms import PostForm
 
-from ..models import Comment, Follow, Group, Post, User
+from ..media import storage
+from ..models import Comment, Follow, Group, Post, PostRating, User
+from .transactions import capture_on_commit_callbacks
 
 
 TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
@@ -95,7 +100,9 @@ class PostViewTests(TestCase):
             test_post.text: self.post.text,
             test_post.author: self.user,
             test_post.group: self.group,
-            test_post.image: f'posts/{self.uploaded}'
+            test_post.image: storage.get_hashed_name(
+                f'posts/{self.uploaded}', self.uploaded,
+            )
         }
         for value, expected_value in post_atributes.items():
             with self.subTest(value=value):
@@ -203,22 +210,38 @@ class PostViewTests(TestCase):
         self.assertIn(comment, response.context['comments'])
 
     def test_post_index_cache_correct_working(self):
-        """Проверяем работу кэша на странице index."""
+        """Проверяем работу кэша на странице index: без записи через ORM
+        страница берется из кэша, после сохранения поста сбрасывается."""
         response_first = self.authorized_client.get(
             reverse('posts:index')
         )
-        post = Post.objects.get(pk=settings.TEST_POST_INDEX)
-        post.text = 'Измененный текст'
-        post.save()
+        Post.objects.filter(pk=settings.TEST_POST_INDEX).update(
+            text='Измененный текст',
+        )
         response_second = self.authorized_client.get(
             reverse('posts:index')
         )
         self.assertEqual(response_first.content, response_second.content)
-        cache.clear()
+        post = Post.objects.get(pk=settings.TEST_POST_INDEX)
+        with capture_on_commit_callbacks(execute=True):
+            post.save()
         response_third = self.authorized_client.get(
             reverse('posts:index')
         )
         self.assertNotEqual(response_first.content, response_third.content)
+        self.assertContains(response_third, 'Измененный текст')
+
+    def test_post_edit_resets_cached_post_card(self):
+        """Проверяем, что после редактирования поста его карточка
+        в ленте рендерится заново."""
+        self.authorized_client.get(reverse('posts:index'))
+        with capture_on_commit_callbacks(execute=True):
+            self.authorized_client.post(
+                reverse('posts:post_edit', args=(self.post.pk,)),
+                data={'text': 'Отредактированный текст'},
+            )
+        response = self.authorized_client.get(reverse('posts:index'))
+        self.assertContains(response, 'Отредактированный текст')
 
     def test_following_working_correct(self):
         """Проверяем, что подписка работает правильно."""
@@ -276,10 +299,11 @@ class PostViewTests(TestCase):
             self.post,
             response_user_follower_before_following.context['page_obj'],
         )
-        authorized_user_follower.get(reverse(
-            'posts:profile_follow',
-            args=(self.user.username,),
-        ))
+        with capture_on_commit_callbacks(execute=True):
+            authorized_user_follower.get(reverse(
+                'posts:profile_follow',
+                args=(self.user.username,),
+            ))
         response_user_follower_after_following = authorized_user_follower.get(
             reverse('posts:follow_index'),
         )
@@ -311,3 +335,180 @@ class PostViewTests(TestCase):
             ).exists()
         )
 
+
+class FeedQueriesTests(TestCase):
+    """Проверяем, что число запросов ленты не зависит от числа постов."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='test_user')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        cls.author = User.objects.create_user(
+            username='author', first_name='Имя', last_name='Фамилия',
+        )
+        for i in range(settings.POSTS_PER_PAGE + 3):
+            author = User.objects.create_user(username=f'author_{i}')
+            group = Group.objects.create(
+                title=f'Группа {i}', slug=f'group-{i}', description='-',
+            )
+            Post.objects.create(text=f'Пост {i}', author=author, group=group)
+            Post.objects.create(
+                text=f'Пост автора {i}', author=cls.author, group=cls.group,
+            )
+            Follow.objects.create(user=cls.user, author=author)
+
+    def setUp(self):
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+        cache.clear()
+        get_profile(self.user)
+        for follow in Follow.objects.filter(user=self.user):
+            backfill_feed(self.user, follow.author)
+
+    def test_feed_pages_use_constant_number_of_queries(self):
+        """Проверяем число запросов лент при разных размерах страницы."""
+        pages_queries = {
+            reverse('posts:index'): 5,
+            reverse('posts:group_list', args=(self.group.slug,)): 5,
+            reverse('posts:profile', args=(self.author.username,)): 7,
+            reverse('posts:follow_index'): 7,
+        }
+        for posts_per_page in (2, settings.POSTS_PER_PAGE):
+            for page, queries in pages_queries.items():
+                with self.subTest(page=page, posts_per_page=posts_per_page):
+                    cache.clear()
+                    with override_settings(POSTS_PER_PAGE=posts_per_page):
+                        with self.assertNumQueries(queries):
+                            response = self.authorized_client.get(page)
+                    self.assertEqual(
+                        len(response.context['page_obj']), posts_per_page,
+                    )
+
+
+class RatingToggleTests(TestCase):
+    """Тестируем переключение оценки поста без перезагрузки страницы."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.user = User.objects.create_user(username='user')
+        cls.post = Post.objects.create(author=cls.author, text='Пост')
+
+    def setUp(self):
+        self.user_client = Client()
+        self.user_client.force_login(self.user)
+        self.url = reverse('posts:rating_toggle', args=(self.post.pk,))
+
+    def toggle(self, client, state):
+        return client.post(
+            self.url,
+            data={'state': state},
+            HTTP_X_REQUESTED_WITH='XMLHttpRequest',
+        )
+
+    def test_rating_toggle_is_idempotent(self):
+        """Проверяем, что повторный запрос не меняет оценку."""
+        for state, is_rating, rating_count in (
+            ('on', True, 1),
+            ('on', True, 1),
+            ('off', False, 0),
+            ('off', False, 0),
+        ):
+            with self.subTest(state=state):
+                response = self.toggle(self.user_client, state)
+                self.assertEqual(
+                    response.json(),
+                    {'is_rating': is_rating, 'rating_count': rating_count},
+                )
+                self.assertEqual(
+                    PostRating.objects.filter(post=self.post).count(),
+                    rating_count,
+                )
+
+    def test_author_cannot_rate_own_post(self):
+        """Проверяем, что автор не может оценить свой пост."""
+        author_client = Client()
+        author_client.force_login(self.author)
+        response = self.toggle(author_client, 'on')
+        self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
+        self.assertFalse(PostRating.objects.exists())
+
+    def test_rating_toggle_requires_post(self):
+        """Проверяем, что GET-запрос не меняет оценку."""
+        response = self.user_client.get(self.url, {'state': 'on'})
+        self.assertEqual(
+            response.status_code, HTTPStatus.METHOD_NOT_ALLOWED,
+        )
+
+    def test_rating_toggle_without_javascript_redirects(self):
+        """Проверяем, что обычная отправка формы ведет на страницу поста."""
+        response = self.user_client.post(self.url, data={'state': 'on'})
+        self.assertRedirects(
+            response, reverse('posts:post_detail', args=(self.post.pk,)),
+        )
+        self.assertTrue(PostRating.objects.filter(user=self.user).exists())
+
+
+@override_settings(COMMENTS_PER_PAGE=3)
+class CommentsPageTests(TestCase):
+    """Тестируем постраничную подгрузку комментариев."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.post = Post.objects.create(author=cls.author, text='Пост')
+        for i in range(8):
+            user = User.objects.create_user(username=f'user_{i}')
+            Comment.objects.create(
+                post=cls.post, author=user, text=f'Комментарий {i}',
+            )
+
+    def setUp(self):
+        cache.clear()
+        get_profile(self.author)
+
+    def test_post_detail_queries_do_not_depend_on_comments(self):
+        """Проверяем, что страница поста выводит только первую страницу
+        комментариев и не запрашивает авторов по одному."""
+        url = reverse('posts:post_detail', args=(self.post.pk,))
+        with self.assertNumQueries(4):
+            response = Client().get(url)
+        self.assertEqual(
+            list(response.context['comments']),
+            list(self.post.post_comments.all()[:3]),
+        )
+        self.assertContains(
+            response, reverse('posts:post_comments', args=(self.post.pk,)),
+        )
+
+    def test_load_more_returns_all_comments_in_order(self):
+        """Проверяем, что курсоры проходят все комментарии по порядку."""
+        client = Client()
+        url = reverse('posts:post_comments', args=(self.post.pk,))
+        seen = []
+        params = {}
+        while True:
+            response = client.get(
+                url, params, HTTP_X_REQUESTED_WITH='XMLHttpRequest',
+            )
+            self.assertTemplateNotUsed(response, 'base.html')
+            comments = response.context['comments']
+            seen.extend(comments)
+            if not comments.has_next():
+                break
+            params = {'cursor': comments.next_cursor}
+        self.assertEqual(seen, list(self.post.post_comments.all()))
+
+    def test_load_more_without_javascript_renders_page(self):
+        """Проверяем, что без скрипта страница комментариев полная."""
+        response = Client().get(
+            reverse('posts:post_comments', args=(self.post.pk,)),
+        )
+        self.assertTemplateUsed(response, 'posts/comments.html')
@@ -0,0 +1,24 @@
+from contextlib import contextmanager
+
+from django.db import DEFAULT_DB_ALIAS, connections
+
+
+@contextmanager
+def capture_on_commit_callbacks(using=DEFAULT_DB_ALIAS, execute=False):
+    """Функции transaction.on_commit(), зарегистрированные внутри блока.
+
+    TestCase не фиксирует транзакцию, и такие функции не вызываются.
+    С execute=True они выполняются на выходе из блока, как после
+    фиксации. Повторяет TestCase.captureOnCommitCallbacks из Django 3.2.
+    """
+    callbacks = []
+    start_count = len(connections[using].run_on_commit)
+    try:
+        yield callbacks
+    finally:
+        callbacks[:] = [
+            func for _, func in connections[using].run_on_commit[start_count:]
+        ]
+        if execute:
+            for callback in callbacks:
+                callback()
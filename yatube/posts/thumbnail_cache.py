@@ -0,0 +1,63 @@
+from django.conf import settings
+from sorl.thumbnail import default
+from sorl.thumbnail.base import ThumbnailBackend
+from sorl.thumbnail.conf import defaults as thumbnail_defaults
+from sorl.thumbnail.conf import settings as thumbnail_settings
+from sorl.thumbnail.images import ImageFile
+
+
+class ReadyThumbnailBackend(ThumbnailBackend):
+    """Бэкенд sorl, который умеет только искать готовые миниатюры."""
+
+    def get_thumbnail_file(self, file_, geometry_string, **options):
+        """Файл миниатюры с именем, как в get_thumbnail, но без чтения
+        и обработки картинки."""
+        source = ImageFile(file_)
+        if thumbnail_settings.THUMBNAIL_PRESERVE_FORMAT:
+            options.setdefault('format', self._get_format(source))
+        for key, value in self.default_options.items():
+            options.setdefault(key, value)
+        for key, attr in self.extra_options:
+            value = getattr(thumbnail_settings, attr)
+            if value != getattr(thumbnail_defaults, attr):
+                options.setdefault(key, value)
+        name = self._get_thumbnail_filename(source, geometry_string, options)
+        return ImageFile(name, default.storage)
+
+    def get_ready_thumbnail(self, file_, geometry_string, **options):
+        """Готовая миниатюра или None.
+
+        Сначала смотрим в описания, подготовленные prefetch_thumbnails
+        для страницы, и только потом в хранилище ключей sorl.
+        """
+        thumbnail = self.get_thumbnail_file(file_, geometry_string, **options)
+        prefetched = getattr(file_.instance, '_ready_thumbnails', {})
+        if thumbnail.key in prefetched:
+            return prefetched[thumbnail.key]
+        return default.kvstore.get(thumbnail)
+
+
+backend = ReadyThumbnailBackend()
+
+
+def prefetch_thumbnails(posts):
+    """Находим готовые миниатюры картинок постов страницы для всех
+    размеров settings.THUMBNAIL_GEOMETRIES одним обращением к кэшу."""
+    files = {}
+    for post in posts:
+        if not post.image:
+            continue
+        post._ready_thumbnails = {}
+        for geometry, options in settings.THUMBNAIL_GEOMETRIES:
+            thumbnail = backend.get_thumbnail_file(
+                post.image, geometry, **options,
+            )
+            files.setdefault(thumbnail.key, (thumbnail, []))[1].append(post)
+    if not files:
+        return
+    ready = default.kvstore.get_many(
+        [thumbnail for thumbnail, _ in files.values()]
+    )
+    for key, (_, posts) in files.items():
+        for post in posts:
+            post._ready_thumbnails[key] = ready.get(key)
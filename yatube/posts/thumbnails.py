@@ -0,0 +1,170 @@
+import logging
+import time
+from concurrent.futures import ProcessPoolExecutor, wait
+
+import django
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections, transaction
+from sorl.thumbnail import get_thumbnail
+from sorl.thumbnail.images import ImageFile
+
+from .fragments import bump_versions
+from .image_variants import make_image_variants, normalize_original
+from .media import storage
+from .models import Counter, Post
+
+BACKFILL_PROGRESS = 'thumbnail_backfill'
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+
+
+def _init_worker():
+    """Процесс пула не должен пользоваться соединениями родителя."""
+    django.setup()
+    connections.close_all()
+
+
+def get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ProcessPoolExecutor(
+            max_workers=settings.THUMBNAIL_WORKERS,
+            initializer=_init_worker,
+        )
+    return _executor
+
+
+def get_lock_key(post_id, name):
+    return f'thumbnails:{post_id}:{name}'
+
+
+def get_card_scopes(post_id):
+    """Области кэша с карточкой поста: сама карточка и ленты с ней."""
+    scopes = [f'post:{post_id}']
+    post = Post.objects.filter(pk=post_id).values(
+        'author_id', 'group_id',
+    ).first()
+    if post is not None:
+        scopes += ['index', f'profile:{post["author_id"]}']
+        if post['group_id']:
+            scopes.append(f'group:{post["group_id"]}')
+    return scopes
+
+
+def make_thumbnails(post_id, name):
+    """Уменьшаем оригинал, готовим миниатюры картинки для всех размеров
+    из шаблонов и копии для srcset и сбрасываем закэшированные карточки
+    поста и ленты, в которых они лежат."""
+    try:
+        image_name = normalize_original(post_id, name)
+        for geometry, options in settings.THUMBNAIL_GEOMETRIES:
+            get_thumbnail(ImageFile(image_name, storage), geometry, **options)
+        make_image_variants(post_id, image_name)
+        bump_versions(*get_card_scopes(post_id))
+    finally:
+        cache.delete(get_lock_key(post_id, name))
+
+
+def _log_failure(future):
+    if future.exception() is not None:
+        logger.error(
+            'Не удалось подготовить миниатюры', exc_info=future.exception(),
+        )
+
+
+def schedule_thumbnails(post):
+    """Ставим подготовку миниатюр поста в очередь пула процессов.
+
+    Повторные запросы той же картинки, в том числе из других процессов,
+    пока задача не выполнена, ничего не делают. При
+    settings.THUMBNAIL_WORKERS = 0 миниатюры готовятся сразу.
+    """
+    if not post.image:
+        return
+    name = post.image.name
+    if not cache.add(
+        get_lock_key(post.pk, name), 1, settings.THUMBNAIL_LOCK_TIMEOUT,
+    ):
+        return
+    if not settings.THUMBNAIL_WORKERS:
+        make_thumbnails(post.pk, name)
+        return
+
+    def submit():
+        future = get_executor().submit(make_thumbnails, post.pk, name)
+        future.add_done_callback(_log_failure)
+
+    transaction.on_commit(submit)
+
+
+def _make_thumbnails_safely(post_id, name):
+    try:
+        make_thumbnails(post_id, name)
+    except Exception:
+        logger.exception('Не удалось подготовить миниатюры')
+        return False
+    return True
+
+
+def backfill_thumbnails(chunk_size, workers, restart=False):
+    """Готовим миниатюры и копии всех картинок постов по порядку id.
+
+    Посты читаются частями по chunk_size и обрабатываются пулом из
+    workers процессов (при workers = 0 — в текущем процессе). После
+    каждой части id последнего поста записывается в счетчик
+    BACKFILL_PROGRESS, и прерванный запуск продолжается с места
+    остановки. Картинки, которые сейчас обрабатываются по другому
+    запросу, пропускаются. На каждую часть отдаем словарь
+    с количеством обработанных и неудачных картинок и временем работы.
+    """
+    progress, _ = Counter.objects.get_or_create(name=BACKFILL_PROGRESS)
+    last_pk = 0 if restart else progress.value
+    executor = None
+    if workers:
+        executor = ProcessPoolExecutor(
+            max_workers=workers, initializer=_init_worker,
+        )
+    try:
+        while True:
+            started = time.monotonic()
+            chunk = list(
+                Post.objects.filter(pk__gt=last_pk).exclude(
+                    image='',
+                ).order_by('pk').values_list('pk', 'image')[:chunk_size]
+            )
+            if not chunk:
+                break
+            tasks = [
+                (post_id, name) for post_id, name in chunk
+                if cache.add(
+                    get_lock_key(post_id, name), 1,
+                    settings.THUMBNAIL_LOCK_TIMEOUT,
+                )
+            ]
+            if executor is None:
+                results = [_make_thumbnails_safely(*task) for task in tasks]
+            else:
+                futures = [
+                    executor.submit(_make_thumbnails_safely, *task)
+                    for task in tasks
+                ]
+                wait(futures)
+                results = [future.result() for future in futures]
+            last_pk = chunk[-1][0]
+            Counter.objects.filter(name=BACKFILL_PROGRESS).update(
+                value=last_pk,
+            )
+            yield {
+                'last_pk': last_pk,
+                'done': results.count(True),
+                'failed': results.count(False),
+                'skipped': len(chunk) - len(tasks),
+                'seconds': time.monotonic() - started,
+            }
+        Counter.objects.filter(name=BACKFILL_PROGRESS).update(value=0)
+    finally:
+        if executor is not None:
+            executor.shutdown()
@@ -6,7 +6,9 @@ app_name = 'posts'
 
 urlpatterns = [
     path('', views.index, name='index'),
+    path('hot/', views.index_hot, name='index_hot'),
     path('follow/', views.follow_index, name='follow_index'),
+    path('search/', views.search, name='search'),
     path(
         'profile/<str:username>/follow/',
         views.profile_follow,
@@ -18,8 +20,23 @@ urlpatterns = [
         name='profile_unfollow'
     ),
     path('posts/<int:post_id>/', views.post_detail, name='post_detail'),
+    path(
+        'posts/<int:post_id>/comments/',
+        views.post_comments,
+        name='post_comments'
+    ),
+    path(
+        'posts/<int:post_id>/comments/<int:comment_id>/',
+        views.comment_thread,
+        name='comment_thread'
+    ),
     path('posts/<int:post_id>/rating_up/', views.rating_up, name='rating_up'),
     path('posts/<int:post_id>/rating_down/', views.rating_down, name='rating_down'),
+    path(
+        'posts/<int:post_id>/rating/',
+        views.rating_toggle,
+        name='rating_toggle'
+    ),
     path('profile/<str:username>/', views.profile, name='profile'),
     path('group/<slug:slug>/', views.group_posts, name='group_list'),
     path('posts/<post_id>/edit/', views.post_edit, name='post_edit'),
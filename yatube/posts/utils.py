@@ -1,8 +1,216 @@
+import base64
+import binascii
+import json
+from collections.abc import Sequence
+
 from django.conf import settings
+from django.core.exceptions import ValidationError
 from django.core.paginator import Paginator
+from django.db.models import Q
+from django.http import Http404
+
+DEFAULT_KEYSET = ('created', 'pk')
+
+
+def encode_cursor(values, direction):
+    """Упаковываем ключ поста и направление в непрозрачный токен."""
+    raw = json.dumps([direction, values], separators=(',', ':'))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(token):
+    """Распаковываем токен курсора. Возвращаем None, если он битый."""
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+        direction, values = json.loads(raw.decode())
+    except (binascii.Error, UnicodeDecodeError, ValueError, TypeError):
+        return None
+    if direction not in ('next', 'prev') or not isinstance(values, list):
+        return None
+    if not all(isinstance(value, (str, int, float)) for value in values):
+        return None
+    return direction, values
+
+
+class CursorPage(Sequence):
+    """Страница курсорного пагинатора.
+
+    Повторяет интерфейс django.core.paginator.Page, насколько это нужно
+    шаблонам, но не знает ни номера страницы, ни общего числа постов.
+    """
+
+    number = None
+
+    def __init__(self, object_list, keys, has_next, has_previous):
+        self.object_list = object_list
+        self.keys = keys
+        self._has_next = has_next
+        self._has_previous = has_previous
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def has_next(self):
+        return self._has_next
+
+    def has_previous(self):
+        return self._has_previous
+
+    def has_other_pages(self):
+        return self._has_next or self._has_previous
+
+    @property
+    def next_cursor(self):
+        if not self._has_next:
+            return None
+        return get_cursor(self.object_list[-1], self.keys, 'next')
+
+    @property
+    def previous_cursor(self):
+        if not self._has_previous:
+            return None
+        return get_cursor(self.object_list[0], self.keys, 'prev')
+
+
+def get_cursor(obj, keys, direction):
+    """Строим токен курсора по значениям ключей объекта."""
+    values = []
+    for key in keys:
+        value = getattr(obj, key)
+        values.append(value.isoformat() if hasattr(value, 'isoformat')
+                      else value)
+    return encode_cursor(values, direction)
+
+
+def _get_key_field(queryset, key):
+    """Поле ключа: поле модели или поле результата аннотации."""
+    if key in queryset.query.annotations:
+        return queryset.query.annotations[key].output_field
+    opts = queryset.model._meta
+    return opts.pk if key == 'pk' else opts.get_field(key)
+
+
+def get_keyset_filter(queryset, keys, values, direction):
+    """Условие "строго после ключа" для сортировки по убыванию ключей."""
+    values = [
+        _get_key_field(queryset, key).to_python(value)
+        for key, value in zip(keys, values)
+    ]
+    lookup = 'lt' if direction == 'next' else 'gt'
+    condition = Q()
+    for index, key in enumerate(keys):
+        equal = {keys[i]: values[i] for i in range(index)}
+        condition |= Q(**equal, **{f'{key}__{lookup}': values[index]})
+    return condition
+
+
+def get_keyset_page(queryset, token, per_page, keys=DEFAULT_KEYSET):
+    """Выбираем страницу после (или до) курсора одним запросом по индексу."""
+    decoded = decode_cursor(token) if token else None
+    if decoded is None or len(decoded[1]) != len(keys):
+        direction, values = 'next', None
+    else:
+        direction, values = decoded
+    descending = [f'-{key}' for key in keys]
+    ascending = list(keys)
+    if values is not None:
+        try:
+            queryset = queryset.filter(
+                get_keyset_filter(queryset, keys, values, direction)
+            )
+        except (ValidationError, TypeError, ValueError):
+            raise Http404('Некорректный курсор страницы.')
+    ordering = descending if direction == 'next' else ascending
+    object_list = list(queryset.order_by(*ordering)[:per_page + 1])
+    has_more = len(object_list) > per_page
+    object_list = object_list[:per_page]
+    if direction == 'prev':
+        object_list.reverse()
+        return CursorPage(object_list, keys, True, has_more)
+    return CursorPage(object_list, keys, has_more, values is not None)
+
+
+def get_page_window(number, last, on_each_side=2, on_ends=1):
+    """Номера страниц для ссылок пагинатора: края и окно вокруг текущей.
+
+    None означает пропуск. Длина списка не зависит от числа страниц.
+    """
+    left = max(number - on_each_side, 1)
+    right = min(number + on_each_side, last)
+    window = []
+    if left > on_ends + 2:
+        window.extend(range(1, on_ends + 1))
+        window.append(None)
+    else:
+        left = 1
+    window.extend(range(left, right + 1))
+    if right < last - on_ends - 1:
+        window.append(None)
+        window.extend(range(last - on_ends + 1, last + 1))
+    else:
+        window.extend(range(right + 1, last + 1))
+    return window
+
+
+class CountedPaginator(Paginator):
+    """Пагинатор с заранее известным, возможно приблизительным,
+    количеством объектов.
+
+    Количество влияет только на ссылки пагинатора: страница всегда
+    содержит до per_page объектов, даже если count занижен.
+    """
+
+    def __init__(self, object_list, per_page, count=None, **kwargs):
+        super().__init__(object_list, per_page, **kwargs)
+        if count is not None:
+            self.count = count
+
+    def page(self, number):
+        number = self.validate_number(number)
+        bottom = (number - 1) * self.per_page
+        return self._get_page(
+            self.object_list[bottom:bottom + self.per_page], number, self,
+        )
+
 
+def get_posts_paginator(queryset, request, keys=DEFAULT_KEYSET, count=None):
+    """Страница постов по номеру или по курсору.
 
-def get_posts_paginator(queryset, request):
-    paginator = Paginator(queryset, settings.POSTS_PER_PAGE)
+    По номеру отдаем не глубже settings.PAGINATOR_MAX_PAGE страниц,
+    дальше листаем только курсорами: каждая такая страница стоит
+    столько же, сколько первая. Если count передан, COUNT(*)
+    по выборке не выполняется.
+    """
+    token = request.GET.get('cursor')
+    if token:
+        return get_keyset_page(
+            queryset, token, settings.POSTS_PER_PAGE, keys,
+        )
     page_number = request.GET.get('page')
-    return paginator.get_page(page_number)
+    try:
+        number = int(page_number) if page_number else 1
+    except ValueError:
+        number = 1
+    if number > settings.PAGINATOR_MAX_PAGE:
+        raise Http404('Слишком глубокая страница, используйте курсор.')
+    paginator = CountedPaginator(
+        queryset.order_by(*[f'-{key}' for key in keys]),
+        settings.POSTS_PER_PAGE,
+        count=count,
+    )
+    page_obj = paginator.get_page(number)
+    page_obj.max_page = settings.PAGINATOR_MAX_PAGE
+    page_obj.last_page = min(paginator.num_pages, page_obj.max_page)
+    page_obj.page_window = get_page_window(
+        page_obj.number,
+        page_obj.last_page,
+        settings.PAGINATOR_ON_EACH_SIDE,
+    )
+    page_obj.next_cursor = (
+        get_cursor(page_obj[len(page_obj) - 1], keys, 'next')
+        if page_obj.has_next() else None
+    )
+    return page_obj
@@ -1,22 +1,69 @@
+from urllib.parse import urlencode
+
 from django.conf import settings
 from django.contrib.auth.decorators import login_required
+from django.db import transaction
+from django.http import JsonResponse
 from django.shortcuts import get_object_or_404, redirect, render
-from django.views.decorators.cache import cache_page
+from django.views.decorators.http import require_POST
+
+from core.ratelimit import ratelimit
 
+from .comments import for_comments, get_comments_page, get_subtree
+from .counters import get_estimated_count, get_posts_total, get_profile
+from .feed import FEED_KEYSET, backfill_feed, clear_feed, get_follow_feed
+from .follow_graph import get_following_ids, get_suggestions, is_following
 from .forms import CommentForm, PostForm
-from .models import Follow, Group, Post, PostRating, User
-from .utils import get_posts_paginator
+from .fragments import get_page_cache, get_versions
+from .leaderboards import get_leaderboard_context
+from .models import Comment, Follow, Group, Post, User
+from .ranking import HOT_KEYSET
+from .ratings import set_rating
+from .search import get_search_page
+from .thumbnails import schedule_thumbnails
+from .utils import get_keyset_page, get_posts_paginator
 
 
-@cache_page(settings.CACHES_TIMEOUT_INDEX_PAGE, key_prefix='index_page')
 def index(request):
     """Стартовая страница, выводим все посты из БД."""
     template = 'posts/index.html'
-    posts = Post.objects.all()
-    page_obj = get_posts_paginator(posts, request)
+    posts = Post.objects.for_feed()
+    page_obj = get_posts_paginator(posts, request, count=get_posts_total())
     context = {
         'page_obj': page_obj,
         'index': True,
+        **get_page_cache('index'),
+        **get_leaderboard_context(request),
+    }
+    return render(request, template, context)
+
+
+def index_hot(request):
+    """Популярные посты: листаем курсором по индексу популярности."""
+    template = 'posts/index_hot.html'
+    page_obj = get_keyset_page(
+        Post.objects.for_feed(),
+        request.GET.get('cursor'),
+        settings.POSTS_PER_PAGE,
+        HOT_KEYSET,
+    )
+    context = {
+        'page_obj': page_obj,
+        'hot': True,
+        **get_page_cache('index'),
+        'cache_timeout': settings.HOT_CACHE_TIMEOUT,
+    }
+    return render(request, template, context)
+
+
+def search(request):
+    """Поиск по постам и комментариям."""
+    template = 'posts/search.html'
+    query = request.GET.get('q', '').strip()
+    context = {
+        'query': query,
+        'page_obj': get_search_page(query, request.GET.get('page')),
+        'page_query': urlencode({'q': query}) + '&',
     }
     return render(request, template, context)
 
@@ -25,11 +72,13 @@ def group_posts(request, slug):
     """Выводим посты в группе."""
     template = 'posts/group_list.html'
     group = get_object_or_404(Group, slug=slug)
-    posts = group.posts_in_group.all()
-    page_obj = get_posts_paginator(posts, request)
+    posts = group.posts_in_group.for_feed()
+    page_obj = get_posts_paginator(posts, request, count=group.posts_count)
     context = {
         'group': group,
         'page_obj': page_obj,
+        **get_page_cache(f'group:{group.pk}'),
+        **get_leaderboard_context(request, group.pk),
     }
     return render(request, template, context)
 
@@ -38,68 +87,115 @@ def profile(request, username):
     """Выводим профиль автора."""
     template = 'posts/profile.html'
     author = get_object_or_404(User, username=username)
-    posts = author.author_of_posts.all()
-    page_obj = get_posts_paginator(posts, request)
+    author_profile = get_profile(author)
+    posts = author.author_of_posts.for_feed()
+    page_obj = get_posts_paginator(
+        posts, request, count=author_profile.posts_count,
+    )
     following = (
-        request.user.is_authenticated and request.user.follower.filter(
-            author=author,
-        ).exists()
+        request.user.is_authenticated
+        and is_following(request.user.pk, author.pk)
     )
     context = {
         'author': author,
-        'posts': posts,
+        'author_profile': author_profile,
         'page_obj': page_obj,
         'following': following,
+        'suggestions': (
+            get_suggestions(request.user)
+            if request.user.is_authenticated else []
+        ),
+        **get_page_cache(f'profile:{author.pk}'),
     }
     return render(request, template, context)
 
 
-def post_detail(request, post_id):
-    """Выводим информацию о посте."""
-    template = 'posts/post_detail.html'
-    post = get_object_or_404(Post, pk=post_id)
-    comments = post.post_comments.all()
-    rating = post.rating_post.all()
+def get_post_detail_context(request, post, form):
+    """Контекст страницы поста."""
     is_rating = (
         request.user.is_authenticated and request.user.rating_user.filter(
             post=post,
         ).exists()
     )
-    print(is_rating)
-    form = CommentForm(request.POST or None)
-    context = {
+    scopes = [
+        f'post:{post.pk}',
+        f'post_detail:{post.pk}',
+        f'profile:{post.author_id}',
+    ]
+    if post.group_id:
+        scopes.append(f'group:{post.group_id}')
+    return {
         'post': post,
-        'comments': comments,
-        'rating': rating,
+        'author_profile': get_profile(post.author),
+        'comments': get_comments_page(post.pk),
         'form': form,
         'is_rating': is_rating,
+        **get_page_cache(*scopes),
+    }
+
+
+def post_detail(request, post_id):
+    """Выводим информацию о посте."""
+    template = 'posts/post_detail.html'
+    post = get_object_or_404(Post, pk=post_id)
+    form = CommentForm(request.POST or None)
+    context = get_post_detail_context(request, post, form)
+    return render(request, template, context)
+
+
+def post_comments(request, post_id):
+    """Следующая страница комментариев поста.
+
+    Скрипт страницы поста получает только фрагмент со списком.
+    """
+    post = get_object_or_404(Post.objects.only('pk', 'author_id'), pk=post_id)
+    is_fragment = request.headers.get('x-requested-with') == 'XMLHttpRequest'
+    template = (
+        'includes/comments.html' if is_fragment else 'posts/comments.html'
+    )
+    context = {
+        'post': post,
+        'comments': get_comments_page(post.pk, request.GET.get('cursor')),
+        **get_page_cache(f'post_detail:{post.pk}'),
     }
     return render(request, template, context)
 
 
 @login_required()
+@ratelimit('rating')
 def rating_up(request, post_id):
-    """Увеличиваем рейтинг комментария к посту."""
-    post = get_object_or_404(Post, pk=post_id)
-    if request.user != post.author:
-        PostRating.objects.get_or_create(
-            post=post,
-            user=request.user,
-        )
+    """Увеличиваем рейтинг поста."""
+    set_rating(request.user, post_id, True)
     return redirect('posts:post_detail', post_id)
 
+
 @login_required()
+@ratelimit('rating')
 def rating_down(request, post_id):
-    post = get_object_or_404(Post, pk=post_id)
-    if request.user != post.author:
-        PostRating.objects.filter(
-            post=post,
-            user=request.user,
-        ).delete()
+    """Уменьшаем рейтинг поста."""
+    set_rating(request.user, post_id, False)
     return redirect('posts:post_detail', post_id)
 
 
+@require_POST
 @login_required()
+@ratelimit('rating')
+def rating_toggle(request, post_id):
+    """Ставим или снимаем оценку поста, отвечаем новым состоянием."""
+    is_rating = request.POST.get('state') == 'on'
+    rating_count = set_rating(request.user, post_id, is_rating)
+    if request.headers.get('x-requested-with') != 'XMLHttpRequest':
+        return redirect('posts:post_detail', post_id)
+    if rating_count is None:
+        return JsonResponse({'error': 'Пост нельзя оценить.'}, status=404)
+    return JsonResponse({
+        'is_rating': is_rating,
+        'rating_count': rating_count,
+    })
+
+
+@login_required()
+@ratelimit('post_create', methods=('POST',))
 def post_create(request):
     """Создаем новый пост."""
     template = 'posts/create_post.html'
@@ -110,7 +206,12 @@ def post_create(request):
     if form.is_valid():
         new_post = form.save(commit=False)
         new_post.author = request.user
-        form.save()
+        # Сигналы меняют счетчики автора, группы и сайта в той же
+        # транзакции, что и сохранение поста, а после фиксации
+        # раскладывают пост по лентам подписчиков.
+        with transaction.atomic():
+            form.save()
+        schedule_thumbnails(new_post)
         return redirect('posts:profile', new_post.author)
     context = {
         'form': form,
@@ -136,26 +237,50 @@ def post_edit(request, post_id):
         return redirect('posts:post_detail', editable_post.pk)
     if form.is_valid():
         form.save()
+        if 'image' in form.changed_data:
+            schedule_thumbnails(editable_post)
         return redirect('posts:post_detail', editable_post.pk)
     return render(request, template, context)
 
 
 @login_required
+@ratelimit('add_comment', methods=('POST',))
 def add_comment(request, post_id):
     """Создаем комментарии к посту."""
     template = 'posts/post_detail.html'
     post = get_object_or_404(Post, pk=post_id)
-    comments = post.post_comments.all()
-    form = CommentForm(request.POST or None)
+    form = CommentForm(request.POST or None, post=post)
     if form.is_valid():
         comment = form.save(commit=False)
         comment.author = request.user
         comment.post = post
-        comment.save()
+        # Сигналы меняют счетчики поста и ветки в той же транзакции.
+        with transaction.atomic():
+            comment.save()
+        if comment.parent_id:
+            return redirect(
+                'posts:comment_thread', post_id, comment.parent_id,
+            )
         return redirect('posts:post_detail', post_id)
+    context = get_post_detail_context(request, post, form)
+    return render(request, template, context)
+
+
+def comment_thread(request, post_id, comment_id):
+    """Выводим комментарий с ответами на него."""
+    template = 'posts/comment_thread.html'
+    post = get_object_or_404(Post, pk=post_id)
+    comment = get_object_or_404(
+        for_comments(Comment.objects), pk=comment_id, post=post,
+    )
+    subtree = get_subtree(comment)
     context = {
-        'form': form,
-        'comments': comments,
+        'post': post,
+        'comment': comment,
+        'subtree': subtree,
+        'is_truncated': len(subtree) == settings.COMMENTS_THREAD_LIMIT,
+        'form': CommentForm(initial={'parent': comment}, post=post),
+        **get_page_cache(f'post_detail:{post_id}'),
     }
     return render(request, template, context)
 
@@ -164,30 +289,48 @@ def add_comment(request, post_id):
 def follow_index(request):
     """Выводим посты авторов, на которых подписались."""
     template = 'posts/follow.html'
-    follow_count = Follow.objects.filter(user=request.user).count()
-    posts = Post.objects.filter(author__following__user=request.user)
-    page_obj = get_posts_paginator(posts, request)
+    author_ids = get_following_ids(request.user.pk)
+    posts = get_follow_feed(request.user, author_ids).for_feed()
+    follow_scope = f'follow:{request.user.pk}'
+    page_cache = get_page_cache('index', follow_scope)
+    # Число постов ленты меняется с подписками, а не с каждым постом
+    # на сайте, поэтому ключ зависит только от версии ленты.
+    follow_version = get_versions([follow_scope])[follow_scope]
+    page_obj = get_posts_paginator(
+        posts,
+        request,
+        FEED_KEYSET,
+        count=get_estimated_count(
+            f'follow_count:{request.user.pk}:{follow_version}', posts,
+        ),
+    )
     context = {
         'page_obj': page_obj,
         'follow': True,
-        'follow_count': follow_count,
+        'follow_count': len(author_ids),
+        'suggestions': get_suggestions(request.user),
+        **page_cache,
     }
     return render(request, template, context)
 
 
 @login_required
+@ratelimit('follow')
 def profile_follow(request, username):
     """Подписываемся на профиль автора."""
     author = User.objects.get(username=username)
     if request.user != author:
-        Follow.objects.get_or_create(
+        _, created = Follow.objects.get_or_create(
             user=request.user,
             author=author,
         )
+        if created:
+            backfill_feed(request.user, author)
     return redirect('posts:profile', author.username)
 
 
 @login_required
+@ratelimit('follow')
 def profile_unfollow(request, username):
     """Отписываемся от профиля автора."""
     author = User.objects.get(username=username)
@@ -195,4 +338,5 @@ def profile_unfollow(request, username):
         user=request.user,
         author=author,
     ).delete()
+    clear_feed(request.user, author)
     return redirect('posts:profile', author.username)
@@ -0,0 +1,18 @@
+// Подгружаем следующую страницу комментариев на место кнопки.
+document.addEventListener('click', async (event) => {
+  const link = event.target.closest('[data-comments-more]');
+  if (!link) {
+    return;
+  }
+  event.preventDefault();
+  link.classList.add('disabled');
+  const response = await fetch(link.href, {
+    headers: {'X-Requested-With': 'XMLHttpRequest'},
+    credentials: 'same-origin',
+  });
+  if (!response.ok) {
+    link.classList.remove('disabled');
+    return;
+  }
+  link.outerHTML = await response.text();
+});
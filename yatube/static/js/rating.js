@@ -0,0 +1,32 @@
+// Переключаем оценку поста без перезагрузки страницы.
+document.querySelectorAll('[data-rating-toggle]').forEach((form) => {
+  form.addEventListener('submit', async (event) => {
+    event.preventDefault();
+    const button = form.querySelector('button');
+    const state = form.querySelector('input[name="state"]');
+    button.disabled = true;
+    try {
+      const response = await fetch(form.action, {
+        method: 'POST',
+        body: new FormData(form),
+        headers: {'X-Requested-With': 'XMLHttpRequest'},
+        credentials: 'same-origin',
+      });
+      if (response.redirected) {
+        window.location = response.url;
+        return;
+      }
+      if (!response.ok) {
+        return;
+      }
+      const data = await response.json();
+      state.value = data.is_rating ? 'off' : 'on';
+      button.classList.toggle('bg-light', data.is_rating);
+      document.querySelectorAll('[data-rating-count]').forEach((counter) => {
+        counter.textContent = data.rating_count;
+      });
+    } finally {
+      button.disabled = false;
+    }
+  });
+});
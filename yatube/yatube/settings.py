@@ -108,6 +108,34 @@ AUTH_PASSWORD_VALIDATORS = [
 
 
 POSTS_PER_PAGE = 10
+COMMENTS_PER_PAGE = 20
+COMMENTS_RENDER_DEPTH = 3
+COMMENTS_THREAD_PREVIEW = 10
+COMMENTS_THREAD_LIMIT = 200
+PAGINATOR_MAX_PAGE = 50
+PAGINATOR_ON_EACH_SIDE = 2
+FEED_MAX_ENTRIES = 500
+FEED_FANOUT_MAX_FOLLOWERS = 10000
+FEED_FANOUT_BATCH = 500
+FEED_PULL_AUTHORS_TIMEOUT = 60
+FOLLOW_GRAPH_LOCAL_SIZE = 10000
+RECOMMENDATIONS_PER_USER = 10
+RECOMMENDATIONS_SHOWN = 5
+RECOMMENDATION_NEIGHBOURS = 50
+# Сколько строк матрицы сходства авторов считать за один шаг.
+RECOMMENDATION_SIMILARITY_BLOCK = 1000
+RECOMMENDATION_RATING_WEIGHT = 0.5
+LEADERBOARD_SIZE = 10
+LEADERBOARD_KEEP = 100
+LEADERBOARD_CACHE_TIMEOUT = 60
+HOT_GRAVITY = 1.8
+HOT_MAX_AGE_HOURS = 7 * 24
+HOT_CACHE_TIMEOUT = 60
+SEARCH_MAX_TERMS = 10
+SEARCH_PREFIX_LENGTH = 3
+SEARCH_SNIPPET_TOKENS = 24
+# Сколько самых новых совпадений в каждом индексе ранжировать по BM25.
+SEARCH_RANK_WINDOW = 1000
 TEST_POST_INDEX = 1
 TEST_GROUP_INDEX = 1
 TEST_SECOND_GROUP_INDEX = 2
@@ -137,9 +165,51 @@ CSRF_FAILURE_VIEW = 'core.views.csrf_failure'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+CACHE_LOCATION = os.getenv(
+    'CACHE_LOCATION', os.path.join(BASE_DIR, 'cache.sqlite3'),
+)
 CACHES = {
     'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'BACKEND': 'core.cache_backends.SQLiteCache',
+        'LOCATION': CACHE_LOCATION,
+        'OPTIONS': {
+            'MAX_ENTRIES': 100000,
+            'MAX_SIZE': 256 * 1024 * 1024,
+        },
     }
 }
-CACHES_TIMEOUT_INDEX_PAGE = 20
+CACHES_TIMEOUT_PAGE = 60 * 60 * 6
+COUNT_ESTIMATE_TIMEOUT = 5 * 60
+
+FILE_UPLOAD_HANDLERS = [
+    'core.upload_handlers.LimitedTemporaryFileUploadHandler',
+]
+FILE_UPLOAD_MAX_SIZE = 20 * 2 ** 20
+IMAGE_UPLOAD_MAX_PIXELS = 100 * 10 ** 6
+# Оригиналы больше этой стороны уменьшаются в фоне, EXIF удаляется.
+IMAGE_ORIGINAL_MAX_SIDE = 2560
+# Сколько секунд файл без ссылок живет до удаления сборщиком мусора.
+MEDIA_GC_GRACE = 24 * 60 * 60
+
+THUMBNAIL_KVSTORE = 'core.thumbnail_kvstore.KVStore'
+# Размеры миниатюр из шаблонов, которые готовятся сразу после загрузки.
+THUMBNAIL_GEOMETRIES = (
+    ('960x339', {'crop': 'center', 'upscale': True}),
+)
+THUMBNAIL_WORKERS = 2
+THUMBNAIL_LOCK_TIMEOUT = 5 * 60
+# Копии картинки поста для srcset: пропорции миниатюры ленты.
+IMAGE_VARIANT_WIDTHS = (320, 640, 960, 1280)
+IMAGE_VARIANT_ASPECT = 960 / 339
+IMAGE_VARIANT_DEFAULT_WIDTH = 960
+IMAGE_VARIANT_SIZES = '(max-width: 992px) 100vw, 960px'
+IMAGE_PLACEHOLDER_WIDTH = 16
+
+RATELIMIT_ENABLED = True
+RATELIMIT_IP_HEADER = 'REMOTE_ADDR'
+RATELIMITS = {
+    'post_create': {'user': '10/m', 'ip': '60/m'},
+    'add_comment': {'user': '20/m', 'ip': '120/m'},
+    'rating': {'user': '60/m', 'ip': '300/m'},
+    'follow': {'user': '30/m', 'ip': '180/m'},
+}
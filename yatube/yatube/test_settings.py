@@ -0,0 +1,18 @@
+import atexit
+import os
+import shutil
+import tempfile
+
+from .settings import *  # noqa: F401, F403
+from .settings import CACHES
+
+# Тесты очищают кэш: у каждого прогона свой временный файл,
+# чтобы не стереть кэш запущенного сайта и соседних прогонов.
+CACHE_DIR = tempfile.mkdtemp(prefix='yatube-cache-')
+atexit.register(shutil.rmtree, CACHE_DIR, ignore_errors=True)
+CACHES = {
+    'default': {
+        **CACHES['default'],
+        'LOCATION': os.path.join(CACHE_DIR, 'cache.sqlite3'),
+    },
+}